@@ -0,0 +1,246 @@
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from uuid import UUID
+from typing import Optional, List, Dict, Any
+from .catalog_index import CatalogIndex
+from .db import supabase
+from .responses import json_response, make_etag, not_modified
+
+router = APIRouter()
+catalog_index = CatalogIndex(supabase)
+
+# Seconds between incremental refreshes of the in-memory catalog
+CATALOG_POLL_SECONDS = float(os.getenv("CATALOG_POLL_SECONDS", "30"))
+
+# Seconds between full reloads, which drop rows deleted from the table
+CATALOG_RELOAD_SECONDS = float(os.getenv("CATALOG_RELOAD_SECONDS", "3600"))
+
+async def poll_catalog(interval: float = CATALOG_POLL_SECONDS, reload_interval: float = CATALOG_RELOAD_SECONDS):
+    """Load the catalog snapshot, then keep it current from updated_at"""
+    loaded_at = None
+    while True:
+        try:
+            if loaded_at is None or time.monotonic() - loaded_at >= reload_interval:
+                await run_in_threadpool(catalog_index.load)
+                loaded_at = time.monotonic()
+            else:
+                await run_in_threadpool(catalog_index.refresh)
+        except Exception as e:
+            print(f"❌ ERROR refreshing catalog index: {str(e)}")
+        await asyncio.sleep(interval)
+
+class ReservationItem(BaseModel):
+    id: UUID
+    qty: int = Field(1, gt=0)
+
+class ReservationRequest(BaseModel):
+    items: List[ReservationItem] = Field(..., min_length=1, max_length=1000)
+
+@router.post("/catalog/reserve")
+async def reserve_stock(reservation: ReservationRequest) -> Dict[str, Any]:
+    """
+    Reserve stock for many units in one atomic database call
+
+    Each unit is decremented only if stock_qty >= qty, so concurrent buyers can
+    never oversell. Units requested more than once are summed.
+    """
+    items = [{"id": str(item.id), "qty": item.qty} for item in reservation.items]
+    try:
+        response = await run_in_threadpool(
+            lambda: supabase.rpc('reserve_stock', {'items': items}).execute()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = [
+        {
+            "id": row['unit_id'],
+            "requested": row['requested_qty'],
+            "reserved": row['reserved'],
+            "stock_qty": row['remaining_qty']
+        }
+        for row in response.data
+    ]
+    return {
+        "success": all(result["reserved"] for result in results),
+        "results": results
+    }
+
+# Rows per history RPC call; must not exceed PostgREST's max_rows (supabase/config.toml)
+HISTORY_PAGE_SIZE = 1000
+
+def _fetch_history(function: str, params: Dict[str, Any], next_page) -> List[Dict[str, Any]]:
+    """
+    All rows of a paged history RPC
+
+    PostgREST cuts every response at max_rows, so the function is called
+    HISTORY_PAGE_SIZE rows at a time until a short page, next_page turning the
+    last row of a page into the cursor arguments of the next call.
+    """
+    rows = []
+    cursor = {}
+    while True:
+        page = supabase.rpc(function, {**params, **cursor, "p_limit": HISTORY_PAGE_SIZE}).execute().data
+        rows.extend(page)
+        if len(page) < HISTORY_PAGE_SIZE:
+            return rows
+        cursor = next_page(page[-1])
+
+def _history_filters(
+    unit_id: Optional[UUID],
+    developer: Optional[str],
+    project_name: Optional[str]
+) -> Dict[str, Any]:
+    """RPC filter arguments for one unit or one project"""
+    if unit_id is None and (developer is None or project_name is None):
+        raise HTTPException(status_code=400, detail="Provide unit_id or both developer and project_name")
+    return {
+        "p_unit_id": str(unit_id) if unit_id is not None else None,
+        "p_developer": developer,
+        "p_project_name": project_name
+    }
+
+@router.get("/catalog/history")
+async def get_catalog_state(
+    as_of: datetime,
+    unit_id: Optional[UUID] = None,
+    developer: Optional[str] = None,
+    project_name: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Price and stock of a unit or a whole project as of a point in time
+
+    Args:
+        as_of: Point in time to rebuild the state for
+        unit_id: Catalog id of a single unit
+        developer: Developer of the project, together with project_name
+        project_name: Project to rebuild all units of
+    """
+    params = _history_filters(unit_id, developer, project_name)
+    params["p_as_of"] = as_of.isoformat()
+    try:
+        rows = await run_in_threadpool(
+            _fetch_history, 'catalog_state_as_of', params,
+            lambda row: {"p_after_id": row['catalog_id']}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "as_of": as_of,
+        "rows": rows
+    }
+
+@router.get("/catalog/history/series")
+async def get_catalog_price_series(
+    start: datetime,
+    end: Optional[datetime] = None,
+    unit_id: Optional[UUID] = None,
+    developer: Optional[str] = None,
+    project_name: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Price and stock time series of a unit or a whole project
+
+    The first point of each unit is its state at start, followed by one point
+    per change up to end, with unchanged fields filled forward.
+
+    Args:
+        start: Beginning of the series
+        end: End of the series, defaults to now
+        unit_id: Catalog id of a single unit
+        developer: Developer of the project, together with project_name
+        project_name: Project to chart all units of
+    """
+    if end is None:
+        end = datetime.now(timezone.utc)
+    params = _history_filters(unit_id, developer, project_name)
+    params["p_from"] = start.isoformat()
+    params["p_to"] = end.isoformat()
+    try:
+        points = await run_in_threadpool(
+            _fetch_history, 'catalog_price_series', params,
+            lambda point: {"p_after_id": point['catalog_id'], "p_after_time": point['changed_at']}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {
+        "start": start,
+        "end": end,
+        "points": points
+    }
+
+@router.get("/catalog/search")
+async def search_catalog(
+    request: Request,
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=200)
+) -> Response:
+    """
+    Fuzzy search listings by developer, project name, room type or block
+
+    Args:
+        q: Search text, matched by trigram similarity
+        limit: Maximum number of ranked rows to return
+    """
+    if not catalog_index.loaded:
+        raise HTTPException(status_code=503, detail="Catalog index is still loading")
+
+    etag = make_etag(catalog_index.version(), request.url.query)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    return json_response(request, {
+        "query": q,
+        "rows": catalog_index.search(q, limit)
+    }, etag)
+
+@router.get("/catalog")
+async def list_catalog(
+    request: Request,
+    developer: Optional[str] = None,
+    project_name: Optional[str] = None,
+    room_type: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0)
+) -> Response:
+    """
+    Filter catalog listings from the in-memory index, ordered by price
+
+    Args:
+        developer: Exact developer name
+        project_name: Exact project name
+        room_type: Exact room type
+        min_price: Lowest price_baht to include
+        max_price: Highest price_baht to include
+    """
+    if not catalog_index.loaded:
+        raise HTTPException(status_code=503, detail="Catalog index is still loading")
+
+    etag = make_etag(catalog_index.version(), request.url.query)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    total, rows = catalog_index.query(
+        developer=developer,
+        project_name=project_name,
+        room_type=room_type,
+        min_price=min_price,
+        max_price=max_price,
+        limit=limit,
+        offset=offset
+    )
+    return json_response(request, {
+        "total": total,
+        "rows": rows
+    }, etag)
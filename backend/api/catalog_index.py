@@ -0,0 +1,352 @@
+import hashlib
+import sys
+import threading
+import numpy as np
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from .trigram_index import TrigramIndex
+
+# Columns read from the catalog table
+CATALOG_COLUMNS = [
+    'id', 'developer', 'project_name', 'room_type', 'room_nymber',
+    'block', 'sq_m', 'price_baht', 'stock_qty', 'updated_at'
+]
+
+# Low-cardinality text columns stored as int32 codes into a shared string pool,
+# which are also the columns covered by fuzzy search
+INTERNED_COLUMNS = ['developer', 'project_name', 'room_type', 'block']
+
+# Rows per PostgREST request while loading or refreshing
+FETCH_PAGE_SIZE = 1000
+
+# Re-read this much history on each refresh, so rows committed late with an
+# earlier updated_at (now() is the transaction start time) are not missed
+REFRESH_OVERLAP = timedelta(seconds=60)
+
+class StringPool:
+    """Interns strings and maps them to stable int32 codes"""
+
+    def __init__(self, on_add: Optional[Callable[[int, str], None]] = None):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+        self.on_add = on_add
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            value = sys.intern(value)
+            self.values.append(value)
+            self.codes[value] = code
+            if self.on_add is not None:
+                self.on_add(code, value)
+        return code
+
+    def lookup(self, value: str) -> Optional[int]:
+        return self.codes.get(value)
+
+class CatalogSnapshot:
+    """Immutable columnar view of the catalog with its secondary indexes"""
+
+    __slots__ = (
+        'ids', 'positions', 'columns', 'updated_at', 'max_updated_at',
+        'by_developer', 'by_project', 'by_room_type', 'combo_codes', 'by_combo',
+        'price_order', 'sorted_prices', 'price_rank', 'checksum'
+    )
+
+    def __init__(self, ids: np.ndarray, columns: Dict[str, np.ndarray], updated_at: np.ndarray):
+        self.ids = ids
+        self.positions = {row_id: position for position, row_id in enumerate(ids)}
+        self.columns = columns
+        self.updated_at = updated_at
+        self.max_updated_at = max(updated_at) if len(updated_at) else None
+        # Order-independent sum of per-row digests of (id, updated_at); uint64 wraps
+        self.checksum = int(columns['row_digest'].sum(dtype=np.uint64))
+
+        self.by_developer = _group_positions(columns['developer'])
+        self.by_room_type = _group_positions(columns['room_type'])
+        project_keys = columns['developer'].astype(np.int64) << 32 | columns['project_name'].astype(np.int64)
+        self.by_project = _group_positions(project_keys)
+
+        # Distinct combinations of the interned columns, so fuzzy search can rank
+        # a few thousand combinations instead of every row
+        codes = np.stack([columns[column] for column in INTERNED_COLUMNS], axis=1)
+        _, first, combo_ids = np.unique(_combo_keys(codes), return_index=True, return_inverse=True)
+        self.combo_codes = codes[first]
+        self.by_combo = _group_positions(combo_ids.reshape(-1))
+
+        self.price_order = np.argsort(columns['price_baht'], kind='stable')
+        self.sorted_prices = columns['price_baht'][self.price_order]
+        self.price_rank = np.empty_like(self.price_order)
+        self.price_rank[self.price_order] = np.arange(len(self.price_order))
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+def _combo_keys(codes: np.ndarray) -> np.ndarray:
+    """One int64 key per row of codes, packed mixed-radix when it fits"""
+    radixes = [int(column.max()) + 1 if len(column) else 1 for column in codes.T]
+    if np.prod(radixes, dtype=float) >= 2 ** 63:
+        return np.unique(codes, axis=0, return_inverse=True)[1].reshape(-1)
+    keys = np.zeros(len(codes), dtype=np.int64)
+    for radix, column in zip(radixes, codes.T):
+        keys = keys * radix + column
+    return keys
+
+def _row_digest(row: Dict[str, Any]) -> int:
+    """Stable 64-bit digest of a row version, the same in every process"""
+    key = f"{row['id']}\x1f{row['updated_at']}".encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little')
+
+def _group_positions(keys: np.ndarray) -> Dict[int, np.ndarray]:
+    """Build {key: sorted row positions} for an integer key column"""
+    if not len(keys):
+        return {}
+    order = np.argsort(keys, kind='stable')
+    unique_keys, starts = np.unique(keys[order], return_index=True)
+    return {
+        int(key): positions
+        for key, positions in zip(unique_keys, np.split(order, starts[1:]))
+    }
+
+class CatalogIndex:
+    """
+    In-memory, array-backed snapshot of the catalog table for the read path.
+
+    Rows are stored column by column in NumPy arrays, with developer, project,
+    room type and block interned as int32 codes. Secondary indexes on
+    developer/project, room type and sorted price let filter and price range
+    queries avoid a PostgREST round trip, and a trigram index over the interned
+    strings serves fuzzy search. refresh() reads only rows whose updated_at
+    moved since the last load; rows deleted from the table are only dropped by
+    a full load(), which poll_catalog runs every CATALOG_RELOAD_SECONDS.
+    """
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.search_terms = TrigramIndex()
+        self.strings = StringPool(on_add=self.search_terms.add)
+        self.snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.snapshot is not None
+
+    def _fetch(self, since: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Read rows in (updated_at, id) order, paging by keyset
+
+        Each page starts after the last (updated_at, id) seen rather than at an
+        offset, so a row updated mid-read cannot shift unread rows past the
+        cursor. Such a row is read again at its new position; the later copy wins.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        last = None
+        while True:
+            query = self.supabase.table('catalog').select(','.join(CATALOG_COLUMNS))
+            if since is not None:
+                query = query.gte('updated_at', since)
+            if last is not None:
+                query = query.or_(
+                    f'updated_at.gt."{last["updated_at"]}",'
+                    f'and(updated_at.eq."{last["updated_at"]}",id.gt.{last["id"]})'
+                )
+            page = query.order('updated_at').order('id').limit(FETCH_PAGE_SIZE).execute().data
+            for row in page:
+                rows[row['id']] = row
+            if len(page) < FETCH_PAGE_SIZE:
+                return list(rows.values())
+            last = page[-1]
+
+    def _build(self, rows: List[Dict[str, Any]]) -> CatalogSnapshot:
+        columns = {
+            column: np.array([self.strings.code(row[column]) for row in rows], dtype=np.int32)
+            for column in INTERNED_COLUMNS
+        }
+        columns['room_nymber'] = np.array([row['room_nymber'] for row in rows], dtype=object)
+        columns['sq_m'] = np.array([row['sq_m'] for row in rows], dtype=object)
+        columns['price_baht'] = np.array([row['price_baht'] for row in rows], dtype=np.float64)
+        columns['stock_qty'] = np.array([row['stock_qty'] for row in rows], dtype=np.int32)
+        columns['row_digest'] = np.array([_row_digest(row) for row in rows], dtype=np.uint64)
+        ids = np.array([row['id'] for row in rows], dtype=object)
+        updated_at = np.array([row['updated_at'] for row in rows], dtype=object)
+        return CatalogSnapshot(ids, columns, updated_at)
+
+    def load(self) -> int:
+        """Load the whole catalog table and replace the snapshot"""
+        with self._lock:
+            self.snapshot = self._build(self._fetch())
+            return len(self.snapshot)
+
+    def refresh(self) -> int:
+        """
+        Merge rows changed since the last load or refresh into a new snapshot
+
+        Returns:
+            Number of rows that were added or changed
+        """
+        with self._lock:
+            snapshot = self.snapshot
+            if snapshot is None or snapshot.max_updated_at is None:
+                self.snapshot = self._build(self._fetch())
+                return len(self.snapshot)
+
+            since = datetime.fromisoformat(snapshot.max_updated_at) - REFRESH_OVERLAP
+            changed = [
+                row for row in self._fetch(since.isoformat())
+                if row['id'] not in snapshot.positions
+                or snapshot.updated_at[snapshot.positions[row['id']]] != row['updated_at']
+            ]
+            if not changed:
+                return 0
+
+            rows_by_id = {row['id']: row for row in changed}
+            updates = [row for row_id, row in rows_by_id.items() if row_id in snapshot.positions]
+            additions = [row for row_id, row in rows_by_id.items() if row_id not in snapshot.positions]
+
+            # Copy-on-write so readers keep using the previous snapshot meanwhile
+            columns = {column: values.copy() for column, values in snapshot.columns.items()}
+            updated_at = snapshot.updated_at.copy()
+            if updates:
+                patch = self._build(updates)
+                positions = np.array([snapshot.positions[row['id']] for row in updates])
+                for column, values in patch.columns.items():
+                    columns[column][positions] = values
+                updated_at[positions] = patch.updated_at
+
+            ids = snapshot.ids
+            if additions:
+                extra = self._build(additions)
+                columns = {
+                    column: np.concatenate([values, extra.columns[column]])
+                    for column, values in columns.items()
+                }
+                ids = np.concatenate([ids, extra.ids])
+                updated_at = np.concatenate([updated_at, extra.updated_at])
+
+            self.snapshot = CatalogSnapshot(ids, columns, updated_at)
+            return len(rows_by_id)
+
+    def version(self) -> str:
+        """
+        Identifier of the current snapshot contents
+
+        Derived from the data only, so every worker and restarted process
+        serving the same rows agrees on it.
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            return 'empty'
+        return f"{len(snapshot)}:{snapshot.checksum:016x}"
+
+    def query(
+        self,
+        developer: Optional[str] = None,
+        project_name: Optional[str] = None,
+        room_type: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        limit: int = 100,
+        offset: int = 0
+    ) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Filter listings using the secondary indexes
+
+        Returns:
+            Tuple of (total matches, requested page of rows ordered by price)
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            return 0, []
+
+        candidates = []
+
+        if developer is not None:
+            developer_code = self.strings.lookup(developer)
+            if developer_code is None:
+                return 0, []
+            if project_name is not None:
+                project_code = self.strings.lookup(project_name)
+                key = developer_code << 32 | project_code if project_code is not None else None
+                positions = snapshot.by_project.get(key) if key is not None else None
+            else:
+                positions = snapshot.by_developer.get(developer_code)
+            if positions is None:
+                return 0, []
+            candidates.append(positions)
+        elif project_name is not None:
+            project_code = self.strings.lookup(project_name)
+            if project_code is None:
+                return 0, []
+            candidates.append(np.flatnonzero(snapshot.columns['project_name'] == project_code))
+
+        if room_type is not None:
+            room_type_code = self.strings.lookup(room_type)
+            positions = snapshot.by_room_type.get(room_type_code) if room_type_code is not None else None
+            if positions is None:
+                return 0, []
+            candidates.append(positions)
+
+        if min_price is not None or max_price is not None:
+            low = np.searchsorted(snapshot.sorted_prices, min_price, 'left') if min_price is not None else 0
+            high = np.searchsorted(snapshot.sorted_prices, max_price, 'right') if max_price is not None else len(snapshot)
+            candidates.append(np.sort(snapshot.price_order[low:high]))
+
+        if candidates:
+            candidates.sort(key=len)
+            matches = candidates[0]
+            for positions in candidates[1:]:
+                matches = np.intersect1d(matches, positions, assume_unique=True)
+            matches = matches[np.argsort(snapshot.price_rank[matches])]
+        else:
+            matches = snapshot.price_order
+
+        return len(matches), [self._row(snapshot, position) for position in matches[offset:offset + limit]]
+
+    def search(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        Fuzzy search over developer, project name, room type and block
+
+        Each row scores the sum of the trigram similarities of its fields that
+        match the query, so rows matching on several fields rank first.
+
+        Returns:
+            Up to limit rows with a "score" key, best match first
+        """
+        snapshot = self.snapshot
+        if snapshot is None:
+            return []
+
+        # Size the array after searching: a concurrent refresh may intern new
+        # strings, and every code the search returns is already in the pool
+        matches = self.search_terms.search(text)
+        similarities = np.zeros(len(self.strings.values))
+        for code, similarity in matches:
+            similarities[code] = similarity
+
+        combo_scores = similarities[snapshot.combo_codes].sum(axis=1)
+        combos = np.flatnonzero(combo_scores)
+        combos = combos[np.argsort(-combo_scores[combos], kind='stable')]
+
+        results = []
+        for combo in combos:
+            for position in snapshot.by_combo[int(combo)][:limit - len(results)]:
+                row = self._row(snapshot, position)
+                row['score'] = round(float(combo_scores[combo]), 4)
+                results.append(row)
+            if len(results) >= limit:
+                break
+        return results
+
+    def _row(self, snapshot: CatalogSnapshot, position: int) -> Dict[str, Any]:
+        columns = snapshot.columns
+        row = {'id': snapshot.ids[position]}
+        for column in INTERNED_COLUMNS:
+            row[column] = self.strings.values[columns[column][position]]
+        row['room_nymber'] = columns['room_nymber'][position]
+        row['sq_m'] = columns['sq_m'][position]
+        row['price_baht'] = float(columns['price_baht'][position])
+        row['stock_qty'] = int(columns['stock_qty'][position])
+        row['updated_at'] = snapshot.updated_at[position]
+        return row
@@ -0,0 +1,64 @@
+import pandas as pd
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+REQUIRED_COLUMNS = [
+    'developer', 'project_name', 'room_type', 'room_nymber',
+    'block', 'sq_m', 'price_baht', 'stock_qty'
+]
+
+class CatalogValidationError(ValueError):
+    """Raised when an uploaded catalog file does not match the catalog schema"""
+
+def parse_catalog_csv(contents: bytes) -> List[Dict[str, Any]]:
+    """
+    Parse a catalog CSV and return validated records ready for upsert.
+    Kept free of module-level clients so it can run in worker processes.
+
+    Args:
+        contents: Raw bytes of the CSV file
+
+    Returns:
+        List of catalog records
+
+    Raises:
+        CatalogValidationError: if columns are missing or values have the wrong type
+    """
+    df = pd.read_csv(BytesIO(contents))
+
+    # Validate required columns
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        raise CatalogValidationError(f"Missing required columns: {', '.join(missing_columns)}")
+
+    # Blank cells read as NaN, which is not valid JSON and would be rejected at upsert time
+    blank = df[REQUIRED_COLUMNS].isna()
+    if blank.any().any():
+        lines = [index + 2 for index in df.index[blank.any(axis=1)][:10]]  # line 1 is the header
+        raise CatalogValidationError(
+            f"Missing values in {', '.join(blank.columns[blank.any()])} on lines {', '.join(map(str, lines))}"
+        )
+
+    # Data type validation and conversion
+    try:
+        df['price_baht'] = pd.to_numeric(df['price_baht'])
+        df['stock_qty'] = pd.to_numeric(df['stock_qty'], downcast='integer')
+        df['sq_m'] = df['sq_m'].astype(str)  # Ensure sq_m is string as per schema
+    except ValueError as e:
+        raise CatalogValidationError(f"Data type validation failed: {str(e)}")
+
+    # Convert DataFrame to list of dictionaries for insertion
+    records = df.to_dict('records')
+    if 'id' in df.columns:
+        # Rows without an id get one from the database default
+        for record in records:
+            if pd.isna(record['id']):
+                del record['id']
+    return records
+
+def try_parse_catalog_csv(contents: bytes) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """Worker entry point for parse_catalog_csv: return (records, None) or (None, error message)"""
+    try:
+        return parse_catalog_csv(contents), None
+    except Exception as e:
+        return None, str(e)
@@ -0,0 +1,102 @@
+import random
+import time
+from googleapiclient.errors import HttpError
+from googleapiclient.http import BatchHttpRequest
+from typing import Any, Dict, List, Optional, Tuple
+
+# Google batch endpoints accept at most this many calls per request
+MAX_BATCH_SIZE = 100
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RETRYABLE_REASONS = {'rateLimitExceeded', 'userRateLimitExceeded', 'backendError'}
+
+def is_retryable(error: Exception) -> bool:
+    """Whether a failed call is worth retrying (rate limits and server errors)"""
+    if not isinstance(error, HttpError):
+        return False
+    if error.resp.status in RETRYABLE_STATUSES:
+        return True
+    details = getattr(error, 'error_details', None)
+    if isinstance(details, list):
+        return any(isinstance(detail, dict) and detail.get('reason') in RETRYABLE_REASONS for detail in details)
+    return False
+
+class DriveBatch:
+    """
+    Queue Drive API calls and send them as batch HTTP requests
+
+    Calls are sent in batches of up to MAX_BATCH_SIZE. Items that fail with a
+    rate limit or server error are retried in a new batch with exponential
+    backoff; other failures are reported per item without affecting the rest.
+
+    Example:
+        batch = DriveBatch(drive_service)
+        batch.add(file_id, drive_service.files().delete(fileId=file_id))
+        results = batch.execute()
+    """
+
+    def __init__(self, drive_service, max_retries: int = 5, batch_uri: Optional[str] = None):
+        """
+        Args:
+            drive_service: Drive v3 service from googleapiclient.discovery.build
+            max_retries: How many times a retryable item is resent
+            batch_uri: Override the batch endpoint, e.g. to point at a local fake
+        """
+        self.drive_service = drive_service
+        self.max_retries = max_retries
+        self.batch_uri = batch_uri
+        self.pending: List[Tuple[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.pending)
+
+    def add(self, request_id: str, request):
+        """Queue an unexecuted API request under a caller-chosen id"""
+        self.pending.append((request_id, request))
+
+    def _new_batch(self, callback) -> BatchHttpRequest:
+        if self.batch_uri:
+            return BatchHttpRequest(callback=callback, batch_uri=self.batch_uri)
+        return self.drive_service.new_batch_http_request(callback=callback)
+
+    def _send(self, items: List[Tuple[str, Any]]) -> Dict[str, Tuple[Optional[dict], Optional[Exception]]]:
+        results = {}
+
+        def callback(request_id, response, exception):
+            results[request_id] = (response, exception)
+
+        batch = self._new_batch(callback)
+        for request_id, request in items:
+            batch.add(request, request_id=request_id)
+        try:
+            batch.execute()
+        except Exception as e:
+            # The batch request itself failed, so every item in it failed the same way
+            return {request_id: (None, e) for request_id, _ in items}
+        return results
+
+    def execute(self) -> Dict[str, Tuple[Optional[dict], Optional[Exception]]]:
+        """
+        Send all queued calls and clear the queue
+
+        Returns:
+            {request id: (response, None)} for successes and
+            {request id: (None, exception)} for items that finally failed
+        """
+        pending, self.pending = self.pending, []
+        requests = dict(pending)
+        results = {}
+
+        for attempt in range(self.max_retries + 1):
+            retry = []
+            for start in range(0, len(pending), MAX_BATCH_SIZE):
+                for request_id, (response, error) in self._send(pending[start:start + MAX_BATCH_SIZE]).items():
+                    results[request_id] = (response, error)
+                    if error is not None and (is_retryable(error) or not isinstance(error, HttpError)):
+                        retry.append((request_id, requests[request_id]))
+            if not retry or attempt == self.max_retries:
+                break
+            time.sleep(2 ** attempt + random.random())
+            pending = retry
+
+        return results
@@ -1,8 +1,55 @@
 import os
 from google.oauth2.service_account import Credentials
 import gspread
+from gspread.urls import DRIVE_FILES_API_V3_URL
+from gspread.utils import ValueRenderOption, numericise_all, rowcol_to_a1
 import pandas as pd
-from typing import List, Optional
+from typing import Iterator, List, Optional, Tuple
+
+DEFAULT_CHUNK_ROWS = 5000
+
+def iter_sheet_chunks(
+    worksheet,
+    chunk_size: int = DEFAULT_CHUNK_ROWS,
+    start_row: int = 2,
+    value_render_option: ValueRenderOption = ValueRenderOption.unformatted
+) -> Iterator[Tuple[int, int, pd.DataFrame]]:
+    """
+    Read a worksheet in fixed row ranges instead of one get_all_records() call
+
+    The header row is read once, then rows are fetched as raw value lists in
+    ranges of chunk_size (A2:H5001, A5002:H10001, ...) and each range is yielded
+    as its own DataFrame, so large tabs never have to be held in memory at once.
+
+    Args:
+        worksheet: gspread Worksheet to read
+        chunk_size: Number of data rows per request
+        start_row: First sheet row to read, to resume after a committed range
+        value_render_option: Unformatted for typed values, formatted for what the sheet displays
+
+    Yields:
+        Tuple of (first sheet row, last sheet row, DataFrame) per row range,
+        with the header row as columns
+    """
+    header = worksheet.row_values(1)
+    if not header:
+        return
+    
+    width = len(header)
+    last_column = rowcol_to_a1(1, width)[:-1]
+    
+    for start in range(max(start_row, 2), worksheet.row_count + 1, chunk_size):
+        end = min(start + chunk_size - 1, worksheet.row_count)
+        values = worksheet.get(
+            f"A{start}:{last_column}{end}",
+            value_render_option=value_render_option
+        )
+        if not values:
+            continue
+        
+        # The API drops trailing empty cells, so pad rows to the header width
+        rows = [row + [''] * (width - len(row)) for row in values]
+        yield start, end, pd.DataFrame(rows, columns=header)
 
 class GoogleDriveClient:
     """Client for interacting with Google Drive and Google Sheets"""
@@ -26,13 +73,18 @@ class GoogleDriveClient:
         )
         self.client = gspread.authorize(credentials)
 
-    def get_sheet_as_df(self, spreadsheet_id: str, sheet_name: str = None) -> pd.DataFrame:
+    def get_sheet_as_df(self, spreadsheet_id: str, sheet_name: str = None,
+                        chunk_size: int = DEFAULT_CHUNK_ROWS,
+                        value_render_option: ValueRenderOption = ValueRenderOption.formatted) -> pd.DataFrame:
         """
         Read a Google Sheet and return it as a pandas DataFrame
         
         Args:
             spreadsheet_id: The ID of the spreadsheet (from the URL)
             sheet_name: Optional name of the specific sheet to read. If None, reads the first sheet.
+            chunk_size: Number of rows fetched per request
+            value_render_option: Formatted (default) returns values as the sheet displays
+                them, numericised like get_all_records(); unformatted returns raw typed values
             
         Returns:
             pandas.DataFrame containing the sheet data
@@ -47,12 +99,18 @@ class GoogleDriveClient:
             else:
                 worksheet = spreadsheet.get_worksheet(0)
             
-            # Get all values
-            data = worksheet.get_all_records()
-            
-            # Convert to DataFrame
-            df = pd.DataFrame(data)
+            # Read the values in row ranges and combine them
+            chunks = [
+                chunk for _, _, chunk
+                in iter_sheet_chunks(worksheet, chunk_size, value_render_option=value_render_option)
+            ]
+            if not chunks:
+                return pd.DataFrame()
             
+            df = pd.concat(chunks, ignore_index=True)
+            if value_render_option == ValueRenderOption.formatted:
+                # Same conversion get_all_records() applies to formatted strings
+                df = pd.DataFrame([numericise_all(row) for row in df.values.tolist()], columns=df.columns)
             return df
             
         except Exception as e:
@@ -97,4 +155,24 @@ class GoogleDriveClient:
                 'url': f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}"
             }
         except Exception as e:
-            raise Exception(f"Error getting spreadsheet metadata: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"Error getting spreadsheet metadata: {str(e)}")
+
+    def get_modified_time(self, spreadsheet_id: str) -> str:
+        """
+        Get the Drive modifiedTime of a spreadsheet, used as its data version
+        
+        Args:
+            spreadsheet_id: The ID of the spreadsheet
+            
+        Returns:
+            RFC 3339 timestamp of the last modification
+        """
+        try:
+            response = self.client.request(
+                'get',
+                f"{DRIVE_FILES_API_V3_URL}/{spreadsheet_id}",
+                params={'fields': 'modifiedTime', 'supportsAllDrives': True}
+            )
+            return response.json()['modifiedTime']
+        except Exception as e:
+            raise Exception(f"Error getting spreadsheet modified time: {str(e)}") 
\ No newline at end of file
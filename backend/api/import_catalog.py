@@ -1,64 +1,160 @@
 from fastapi import APIRouter, UploadFile, HTTPException
-from supabase import create_client, Client
-import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import multiprocessing
 import os
-from dotenv import load_dotenv
-from io import StringIO
-from typing import Dict, Any
-
-# Load environment variables
-load_dotenv()
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, Any, List, Optional, Tuple
+from .catalog_validation import CatalogValidationError, parse_catalog_csv, try_parse_catalog_csv
+from .db import supabase
+from .write_buffer import WriteBehindBuffer
 
 # Initialize router
 router = APIRouter()
 
-# Initialize Supabase client
-supabase: Client = create_client(
-    os.getenv("SUPABASE_URL", ""),
-    os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
-)
+# Optional write-behind buffer that coalesces small imports into bulk upserts
+write_buffer: Optional[WriteBehindBuffer] = None
+if os.getenv("IMPORT_WRITE_BEHIND", "false").lower() in ("1", "true", "yes"):
+    write_buffer = WriteBehindBuffer(
+        supabase,
+        max_rows=int(os.getenv("IMPORT_FLUSH_ROWS", "5000")),
+        max_delay=float(os.getenv("IMPORT_FLUSH_SECONDS", "2"))
+    )
+
+# Rows per PostgREST upsert request when merging batch imports
+UPSERT_BATCH_SIZE = 1000
+
+# Worker pool for CSV parsing, created on first batch import
+_parse_executor: Optional[ProcessPoolExecutor] = None
+
+def _available_cpus() -> int:
+    """CPUs this process may run on, honouring its affinity mask"""
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _get_parse_executor() -> ProcessPoolExecutor:
+    global _parse_executor
+    if _parse_executor is None:
+        # Forking a server that already runs threads can copy held locks into the
+        # workers; forkserver (spawn where unavailable) starts them from a clean
+        # process. Workers only import catalog_validation, which creates no clients.
+        start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _parse_executor = ProcessPoolExecutor(
+            max_workers=_available_cpus(),
+            mp_context=multiprocessing.get_context(start_method)
+        )
+    return _parse_executor
+
+def _expand_uploads(uploads: List[Tuple[str, bytes]]) -> List[Tuple[str, bytes]]:
+    """Replace zip archives with the CSV files they contain"""
+    files = []
+    for filename, contents in uploads:
+        if not filename.endswith('.zip'):
+            files.append((filename, contents))
+            continue
+        with zipfile.ZipFile(BytesIO(contents)) as archive:
+            for member in archive.infolist():
+                if not member.filename.endswith('.csv') or member.filename.startswith('__MACOSX/'):
+                    continue
+                files.append((f"{filename}/{member.filename}", archive.read(member)))
+    return files
+
+def shutdown_parse_executor():
+    """Stop the CSV parsing workers, if any were started"""
+    global _parse_executor
+    if _parse_executor is not None:
+        _parse_executor.shutdown()
+        _parse_executor = None
+
+def _upsert_merged(records_by_file: Dict[int, List[Dict[str, Any]]]) -> Dict[int, Dict[str, Any]]:
+    """
+    Upsert records from many files in shared batches of UPSERT_BATCH_SIZE.
+    Rows with the same id are merged first, the file listed last winning, since
+    one upsert cannot update a row twice. Records are grouped by column set,
+    since one PostgREST bulk upsert needs uniform keys. A failed batch marks
+    every file that had rows in it as failed.
+
+    Returns:
+        {file index: {"inserted": rows upserted, "error": message or None}}
+    """
+    results = {index: {"inserted": 0, "error": None} for index in records_by_file}
+
+    # {row key: (files the row came from, winning record)}; rows without an id
+    # are inserted as new units, so each of them is kept
+    merged: Dict[Tuple, Tuple[List[int], Dict[str, Any]]] = {}
+    for index, records in records_by_file.items():
+        for position, record in enumerate(records):
+            record_id = record.get('id')
+            key = ('id', record_id) if isinstance(record_id, str) and record_id else (index, position)
+            owners = merged[key][0] if key in merged else []
+            owners.append(index)
+            merged[key] = (owners, record)
+
+    groups: Dict[Tuple[str, ...], List[Tuple[List[int], Dict[str, Any]]]] = {}
+    for owners, record in merged.values():
+        groups.setdefault(tuple(record), []).append((owners, record))
+
+    for rows in groups.values():
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = rows[start:start + UPSERT_BATCH_SIZE]
+            counts: Dict[int, int] = {}
+            for owners, _ in batch:
+                for index in owners:
+                    counts[index] = counts.get(index, 0) + 1
+            try:
+                supabase.table('catalog').upsert([record for _, record in batch]).execute()
+            except Exception as e:
+                for index in counts:
+                    results[index]["error"] = str(e)
+                continue
+            for index, count in counts.items():
+                results[index]["inserted"] += count
+
+    return results
+
+async def _buffer_records(records: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    Add records to the write buffer and flush inline once it is full.
+    A failed flush leaves the rows buffered for the background flusher, so
+    the records still count as accepted.
+    """
+    buffered = write_buffer.add(records)
+    if write_buffer.full:
+        try:
+            await run_in_threadpool(write_buffer.flush)
+        except Exception as e:
+            print(f"❌ ERROR flushing catalog write buffer: {str(e)}")
+    return buffered
 
 @router.post("/import")
 async def import_catalog(file: UploadFile) -> Dict[str, Any]:
     """
     Import catalog data from CSV file.
     Expected columns: developer, project_name, room_type, room_nymber, block, sq_m, price_baht, stock_qty
+    With IMPORT_WRITE_BEHIND enabled, rows are buffered and upserted in bulk later.
     """
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail="Only CSV files are allowed")
 
     try:
-        # Read CSV content
+        # Read and validate CSV content
         contents = await file.read()
-        csv_string = contents.decode()
-        df = pd.read_csv(StringIO(csv_string))
-
-        # Validate required columns
-        required_columns = [
-            'developer', 'project_name', 'room_type', 'room_nymber',
-            'block', 'sq_m', 'price_baht', 'stock_qty'
-        ]
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Missing required columns: {', '.join(missing_columns)}"
-            )
-
-        # Data type validation and conversion
-        try:
-            df['price_baht'] = pd.to_numeric(df['price_baht'])
-            df['stock_qty'] = pd.to_numeric(df['stock_qty'], downcast='integer')
-            df['sq_m'] = df['sq_m'].astype(str)  # Ensure sq_m is string as per schema
-        except ValueError as e:
-            raise HTTPException(
-                status_code=400,
-                detail=f"Data type validation failed: {str(e)}"
-            )
-
-        # Convert DataFrame to list of dictionaries for insertion
-        records = df.to_dict('records')
-        
+        records = parse_catalog_csv(contents)
+
+        if write_buffer is not None:
+            buffered = await _buffer_records(records)
+            return {
+                "success": True,
+                "inserted": len(records),
+                "buffered": True,
+                "coalesced": buffered["coalesced"],
+                "pending": len(write_buffer),
+                "message": f"Accepted {len(records)} records for the next bulk upsert"
+            }
+
         # Bulk upsert to Supabase
         result = supabase.table('catalog').upsert(records).execute()
 
@@ -68,5 +164,112 @@ async def import_catalog(file: UploadFile) -> Dict[str, Any]:
             "message": f"Successfully processed {len(records)} records"
         }
 
+    except CatalogValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/import/flush")
+async def flush_import_buffer() -> Dict[str, Any]:
+    """
+    Write all rows waiting in the write-behind buffer now
+    Also reports the buffered rows the database rejected since the last call,
+    including those dropped by background flushes.
+    """
+    if write_buffer is None:
+        return {"success": True, "flushed": 0, "rejected": [], "message": "Write-behind buffering is disabled"}
+
+    try:
+        flushed = await run_in_threadpool(write_buffer.flush)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    rejected = write_buffer.take_rejected()
+    return {
+        "success": not rejected,
+        "flushed": flushed,
+        "rejected": rejected,
+        "message": f"Flushed {flushed} buffered records, {len(rejected)} rejected"
+    }
+
+@router.post("/import/batch")
+async def import_catalog_batch(files: List[UploadFile]) -> Dict[str, Any]:
+    """
+    Import many catalog CSV files in one request.
+    Accepts CSV files and zip archives of CSV files. Files are parsed and
+    validated concurrently in a process pool sized to the available cores,
+    their rows are upserted in shared batches, and one result is returned per file.
+    With IMPORT_WRITE_BEHIND enabled, rows go through the write buffer instead.
+    """
+    uploads = []
+    for file in files:
+        if not file.filename.endswith(('.csv', '.zip')):
+            raise HTTPException(status_code=400, detail=f"Only CSV or zip files are allowed: {file.filename}")
+        uploads.append((file.filename, await file.read()))
+
+    try:
+        named_files = _expand_uploads(uploads)
+    except zipfile.BadZipFile as e:
+        raise HTTPException(status_code=400, detail=f"Invalid zip archive: {str(e)}")
+
+    # Parse and validate all files concurrently
+    loop = asyncio.get_running_loop()
+    executor = _get_parse_executor()
+    parsed = await asyncio.gather(*[
+        loop.run_in_executor(executor, try_parse_catalog_csv, contents)
+        for _, contents in named_files
+    ])
+
+    records_by_file = {
+        index: records
+        for index, (records, error) in enumerate(parsed)
+        if error is None
+    }
+
+    buffered = None
+    if write_buffer is not None:
+        # Go through the buffer like single imports, so a later flush of older
+        # buffered rows cannot overwrite these writes
+        buffered = await _buffer_records([
+            record for records in records_by_file.values() for record in records
+        ])
+        upserted = {
+            index: {"inserted": len(records), "error": None}
+            for index, records in records_by_file.items()
+        }
+    else:
+        try:
+            upserted = await run_in_threadpool(_upsert_merged, records_by_file)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    results = []
+    for index, (filename, _) in enumerate(named_files):
+        records, error = parsed[index]
+        if error is None:
+            inserted = upserted[index]["inserted"]
+            error = upserted[index]["error"]
+        else:
+            inserted = 0
+        results.append({
+            "filename": filename,
+            "success": error is None,
+            "inserted": inserted,
+            "error": error
+        })
+
+    inserted_total = sum(result["inserted"] for result in results)
+    response = {
+        "success": all(result["success"] for result in results),
+        "inserted": inserted_total,
+        "files": results,
+        "message": f"Processed {len(results)} files, {inserted_total} records"
+    }
+    if buffered is not None:
+        response.update({
+            "buffered": True,
+            "coalesced": buffered["coalesced"],
+            "pending": len(write_buffer),
+            "message": f"Accepted {inserted_total} records from {len(results)} files for the next bulk upsert"
+        })
+    return response
@@ -0,0 +1,102 @@
+import gzip
+import hashlib
+import orjson
+from fastapi import Request, Response
+from typing import Any, Optional
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; fall back to gzip only
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed
+COMPRESSION_THRESHOLD = 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag derived from the data version of a resource"""
+    digest = hashlib.sha1("\x1f".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest}"'
+
+def _base_tag(tag: str) -> str:
+    """Strip the content-coding suffix that json_response adds to ETags"""
+    tag = tag.strip()
+    for suffix in ('-br"', '-gzip"'):
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """
+    Return a 304 response if the client already holds this version
+
+    Call before building the payload so unchanged resources cost no work.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+        if _base_tag(tag) == etag:
+            # Repeat the tag of the representation the client holds, e.g. its "-gzip" variant
+            return Response(status_code=304, headers={"ETag": tag, "Vary": "Accept-Encoding"})
+    return None
+
+def _negotiate_encoding(request: Request) -> Optional[str]:
+    accepted = {}
+    for item in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                continue
+        accepted[coding.strip().lower()] = quality
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def json_response(request: Request, payload: Any, etag: Optional[str] = None) -> Response:
+    """
+    Serialize a payload with orjson and compress it when the client allows
+
+    Args:
+        request: Incoming request, used for Accept-Encoding and If-None-Match
+        payload: JSON-serializable data; NumPy scalars and arrays are supported
+        etag: ETag from make_etag(); derived from the body when not given
+
+    Returns:
+        JSON response, compressed with br or gzip above COMPRESSION_THRESHOLD,
+        or 304 when If-None-Match matches
+    """
+    body = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    if etag is None:
+        etag = make_etag(hashlib.sha1(body).hexdigest())
+
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+
+    headers = {"Vary": "Accept-Encoding"}
+    encoding = _negotiate_encoding(request) if len(body) >= COMPRESSION_THRESHOLD else None
+    if encoding == "br":
+        body = brotli.compress(body, quality=BROTLI_QUALITY)
+    elif encoding == "gzip":
+        body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+    if encoding:
+        # Each content-coding is its own representation, so it gets its own strong tag
+        headers["Content-Encoding"] = encoding
+        headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+    else:
+        headers["ETag"] = etag
+
+    return Response(content=body, media_type="application/json", headers=headers)
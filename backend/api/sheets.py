@@ -1,6 +1,7 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
 from typing import Optional, List, Dict, Any
 from .google_client import GoogleDriveClient
+from .responses import json_response, make_etag, not_modified
 import os
 
 router = APIRouter()
@@ -36,28 +37,37 @@ async def list_sheets():
 
 @router.get("/sheets/{spreadsheet_id}")
 async def get_sheet_data(
+    request: Request,
     spreadsheet_id: str,
     sheet_name: Optional[str] = None
-) -> Dict[str, Any]:
+) -> Response:
     """
     Get data from a specific Google Sheet
     
+    The ETag is derived from the spreadsheet's Drive modifiedTime, so a client
+    sending If-None-Match gets a 304 without the sheet being read again.
+    
     Args:
         spreadsheet_id: ID of the spreadsheet
         sheet_name: Optional name of the specific sheet to read
     """
     try:
+        etag = make_etag(spreadsheet_id, sheet_name, google_client.get_modified_time(spreadsheet_id))
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        
         # First get metadata
         metadata = google_client.get_sheet_metadata(spreadsheet_id)
         
         # Then get the data
         df = google_client.get_sheet_as_df(spreadsheet_id, sheet_name)
         
-        return {
+        return json_response(request, {
             "metadata": metadata,
             "rows": len(df),
             "columns": list(df.columns),
             "data": df.to_dict('records')
-        }
+        }, etag)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
@@ -0,0 +1,85 @@
+import re
+from collections import Counter
+from typing import Dict, List, Set, Tuple
+
+# Minimum trigram similarity for a term to match, same default as pg_trgm
+SIMILARITY_THRESHOLD = 0.3
+
+_WORD_RE = re.compile(r'\w+')
+
+def _word_trigrams(word: str) -> Set[str]:
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Split text into pg_trgm-style trigrams
+
+    Each lower-cased word is padded with two spaces in front and one behind,
+    so "Sea" gives {"  s", " se", "sea", "ea "}.
+    """
+    grams = set()
+    for word in _WORD_RE.findall(text.lower()):
+        grams.update(_word_trigrams(word))
+    return grams
+
+class TrigramIndex:
+    """
+    Inverted index from trigrams to term ids, for fuzzy matching of short names
+
+    A term matches by its best window of consecutive words, like pg_trgm's
+    word_similarity(), so "sansiri" finds "Sansiri Public Company Limited"
+    although it shares few trigrams with the whole name.
+
+    Terms are added incrementally and never removed. Posting lists are plain
+    lists so readers can iterate them while a writer appends.
+    """
+
+    def __init__(self):
+        self.postings: Dict[str, List[int]] = {}
+        self.term_words: Dict[int, List[Set[str]]] = {}
+
+    def add(self, term_id: int, text: str):
+        words = [_word_trigrams(word) for word in _WORD_RE.findall(text.lower())]
+        self.term_words[term_id] = words
+        for gram in set().union(*words):
+            self.postings.setdefault(gram, []).append(term_id)
+
+    def search(self, query: str, threshold: float = SIMILARITY_THRESHOLD) -> List[Tuple[int, float]]:
+        """
+        Find terms similar to the query
+
+        Returns:
+            List of (term id, similarity of the best word window) above the
+            threshold, best first
+        """
+        grams = trigrams(query)
+        if not grams:
+            return []
+
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+
+        matches = []
+        for term_id, count in shared.items():
+            # No window can share more than the whole term, and every window's
+            # union with the query is at least the query itself
+            if count / len(grams) < threshold:
+                continue
+            similarity = _best_window_similarity(grams, self.term_words[term_id])
+            if similarity >= threshold:
+                matches.append((term_id, similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+def _best_window_similarity(grams: Set[str], words: List[Set[str]]) -> float:
+    """Highest trigram similarity between the query and any run of consecutive words"""
+    best = 0.0
+    for start in range(len(words)):
+        window: Set[str] = set()
+        for word in words[start:]:
+            window |= word
+            common = len(grams & window)
+            best = max(best, common / (len(grams) + len(window) - common))
+    return best
@@ -0,0 +1,164 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from fastapi.concurrency import run_in_threadpool
+from postgrest.exceptions import APIError
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+# Columns that identify a unit when a record carries no id
+NATURAL_KEY = ('developer', 'project_name', 'block', 'room_nymber')
+
+# Rows per PostgREST upsert request when flushing
+FLUSH_BATCH_SIZE = 1000
+
+# Rejected rows kept for inspection; older ones are dropped
+MAX_REJECTED = 1000
+
+def record_key(record: Dict[str, Any]) -> Tuple:
+    """Key a record by its id if it has one, otherwise by its natural key"""
+    record_id = record.get('id')
+    if isinstance(record_id, str) and record_id:
+        return ('id', record_id)
+    return tuple(str(record.get(column)) for column in NATURAL_KEY)
+
+def is_row_error(error: Exception) -> bool:
+    """
+    Whether an upsert failed because of the rows it sent, so resending them
+    cannot succeed: Postgres data (22), integrity (23) and schema (42) errors
+    and PostgREST request errors. Connection and server errors are transient.
+    """
+    if not isinstance(error, APIError):
+        return False
+    code = str(error.code or '')
+    return code[:2] in ('22', '23', '42') or code.startswith(('PGRST1', 'PGRST2')) or code in ('400', '409', '422')
+
+class WriteBehindBuffer:
+    """
+    Coalesces validated catalog rows in memory and writes them in bulk upserts.
+
+    Only the last write per unit is kept, so a burst of small imports touching
+    the same units turns into one upsert per unit. The buffer is flushed when it
+    holds max_rows units, when its oldest row is max_delay seconds old, on
+    shutdown, or on demand. A batch the database rejects for its data is split
+    in halves until the offending rows are isolated; those are dropped from the
+    buffer and kept in rejected with their error. A flush that fails for any
+    other reason puts its rows back unless a newer write for the same unit
+    arrived meanwhile.
+    """
+
+    def __init__(self, supabase, max_rows: int = 5000, max_delay: float = 2.0):
+        self.supabase = supabase
+        self.max_rows = max_rows
+        self.max_delay = max_delay
+        self.rows: Dict[Tuple, Dict[str, Any]] = {}
+        self.oldest: Optional[float] = None
+        self.rejected: Deque[Dict[str, Any]] = deque(maxlen=MAX_REJECTED)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def add(self, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Buffer records, replacing pending writes for the same units
+
+        Returns:
+            {"accepted": records added, "coalesced": pending writes replaced,
+             "pending": units waiting for the next flush}
+        """
+        coalesced = 0
+        with self._lock:
+            for record in records:
+                key = record_key(record)
+                if key in self.rows:
+                    coalesced += 1
+                self.rows[key] = record
+            if self.oldest is None and self.rows:
+                self.oldest = time.monotonic()
+            pending = len(self.rows)
+        return {"accepted": len(records), "coalesced": coalesced, "pending": pending}
+
+    @property
+    def full(self) -> bool:
+        return len(self.rows) >= self.max_rows
+
+    @property
+    def due(self) -> bool:
+        oldest = self.oldest
+        return oldest is not None and time.monotonic() - oldest >= self.max_delay
+
+    def take_rejected(self) -> List[Dict[str, Any]]:
+        """Return and clear the rows dropped since the last call, with their errors"""
+        with self._lock:
+            rejected = list(self.rejected)
+            self.rejected.clear()
+        return rejected
+
+    def _upsert(self, batch: List[Tuple[Tuple, Dict[str, Any]]], rows: Dict[Tuple, Dict[str, Any]]) -> int:
+        """Upsert a batch, bisecting it to isolate rows the database rejects"""
+        try:
+            self.supabase.table('catalog').upsert([record for _, record in batch]).execute()
+        except Exception as e:
+            if not is_row_error(e):
+                raise
+            if len(batch) == 1:
+                key, record = batch[0]
+                print(f"⚠️ Dropping buffered catalog row the database rejected: {str(e)}")
+                with self._lock:
+                    self.rejected.append({"record": record, "error": str(e)})
+                del rows[key]
+                return 0
+            middle = len(batch) // 2
+            return self._upsert(batch[:middle], rows) + self._upsert(batch[middle:], rows)
+        for key, _ in batch:
+            del rows[key]
+        return len(batch)
+
+    def flush(self) -> int:
+        """
+        Upsert all buffered rows
+
+        Returns:
+            Number of rows written; rejected rows are not counted
+
+        Raises:
+            Exception from a transient upsert failure; unwritten rows stay buffered
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self.rows = self.rows, {}
+                self.oldest = None
+            if not rows:
+                return 0
+
+            # One PostgREST bulk upsert needs uniform keys, so group by column set
+            groups: Dict[Tuple[str, ...], List[Tuple[Tuple, Dict[str, Any]]]] = {}
+            for key, record in rows.items():
+                groups.setdefault(tuple(record), []).append((key, record))
+
+            written = 0
+            try:
+                for items in groups.values():
+                    for start in range(0, len(items), FLUSH_BATCH_SIZE):
+                        written += self._upsert(items[start:start + FLUSH_BATCH_SIZE], rows)
+            except Exception:
+                with self._lock:
+                    for key, record in rows.items():
+                        self.rows.setdefault(key, record)
+                    if self.oldest is None:
+                        self.oldest = time.monotonic()
+                raise
+            return written
+
+    async def run(self, interval: float = 0.5):
+        """Flush in the background whenever the oldest row reaches max_delay"""
+        while True:
+            await asyncio.sleep(interval)
+            if not self.due:
+                continue
+            try:
+                await run_in_threadpool(self.flush)
+            except Exception as e:
+                print(f"❌ ERROR flushing catalog write buffer: {str(e)}")
@@ -1,5 +1,9 @@
 #!/usr/bin/env python3
 import os
+import json
+import sqlite3
+import time
+import argparse
 import pandas as pd
 import numpy as np
 from dotenv import load_dotenv
@@ -7,75 +11,149 @@ from supabase import create_client, Client
 from google.oauth2.service_account import Credentials
 import gspread
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 from datetime import datetime
+from api.drive_batch import MAX_BATCH_SIZE, DriveBatch
+from api.google_client import DEFAULT_CHUNK_ROWS, iter_sheet_chunks
 
-def process_worksheet(worksheet, supabase):
-    """Process a single worksheet and import its data to Supabase"""
-    print(f"Processing worksheet: {worksheet.title}")
-    
-    # Get all data from the worksheet
-    data = worksheet.get_all_records()
-    if not data:
-        print("⚠️ Worksheet is empty or has no header row. Skipping.")
-        return False
-    
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-    
-    # Check required columns
-    required_columns = ['developer', 'project_name', 'room_type', 'room_nymber', 'block', 
-                       'sq_m', 'price_baht', 'stock_qty']
-    
-    # Check if all required columns are present
-    missing_columns = [col for col in required_columns if col not in df.columns]
-    if missing_columns:
-        print(f"⚠️ Missing required columns: {', '.join(missing_columns)}. Skipping worksheet.")
-        return False
+class ImportJournal:
+    """Local SQLite checkpoint journal of completed worksheet imports.
+
+    Each worksheet is recorded as soon as its rows are upserted, keyed by
+    (file id, worksheet title, modifiedTime), so a restarted run skips work that
+    already finished. Within a worksheet every upserted row range is recorded
+    too, so an interrupted worksheet resumes after its last committed range. A
+    file edited since the last run has a new modifiedTime and is therefore
+    imported again.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        with self.conn:
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS worksheet_imports (
+                    file_id       TEXT    NOT NULL,
+                    worksheet     TEXT    NOT NULL,
+                    modified_time TEXT    NOT NULL,
+                    rows_upserted INTEGER NOT NULL,
+                    completed_at  TEXT    NOT NULL,
+                    PRIMARY KEY (file_id, worksheet, modified_time)
+                )
+                """
+            )
+            self.conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS worksheet_chunks (
+                    file_id       TEXT    NOT NULL,
+                    worksheet     TEXT    NOT NULL,
+                    modified_time TEXT    NOT NULL,
+                    start_row     INTEGER NOT NULL,
+                    end_row       INTEGER NOT NULL,
+                    rows_upserted INTEGER NOT NULL,
+                    PRIMARY KEY (file_id, worksheet, modified_time, start_row)
+                )
+                """
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS state (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    def get_state(self, key):
+        """Return a stored value (e.g. the Drive changes page token) or None"""
+        row = self.conn.execute("SELECT value FROM state WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_state(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO state VALUES (?, ?)", (key, value))
+
+    def completed_worksheets(self, file_id, modified_time):
+        """Return {worksheet title: rows upserted} already recorded for this file version"""
+        rows = self.conn.execute(
+            "SELECT worksheet, rows_upserted FROM worksheet_imports "
+            "WHERE file_id = ? AND modified_time = ?",
+            (file_id, modified_time)
+        )
+        return dict(rows.fetchall())
+
+    def record_worksheet(self, file_id, worksheet, modified_time, rows_upserted):
+        """Record a finished worksheet; committed immediately so it survives a crash"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO worksheet_imports VALUES (?, ?, ?, ?, ?)",
+                (file_id, worksheet, modified_time, rows_upserted, datetime.now().isoformat())
+            )
+            # The worksheet row supersedes its range progress
+            self.conn.execute(
+                "DELETE FROM worksheet_chunks WHERE file_id = ? AND worksheet = ? AND modified_time = ?",
+                (file_id, worksheet, modified_time)
+            )
+
+    def committed_chunks(self, file_id, worksheet, modified_time):
+        """
+        Return (next row to read, rows upserted so far) for a partly imported worksheet
+
+        A worksheet without recorded ranges starts at row 2, below the header.
+        """
+        next_row, rows_upserted = self.conn.execute(
+            "SELECT MAX(end_row), SUM(rows_upserted) FROM worksheet_chunks "
+            "WHERE file_id = ? AND worksheet = ? AND modified_time = ?",
+            (file_id, worksheet, modified_time)
+        ).fetchone()
+        return (next_row + 1 if next_row is not None else 2), rows_upserted or 0
+
+    def record_chunk(self, file_id, worksheet, modified_time, start_row, end_row, rows_upserted):
+        """Record an upserted row range of a worksheet; committed immediately"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO worksheet_chunks VALUES (?, ?, ?, ?, ?, ?)",
+                (file_id, worksheet, modified_time, start_row, end_row, rows_upserted)
+            )
+
+    def close(self):
+        self.conn.close()
+
+REQUIRED_COLUMNS = ['developer', 'project_name', 'room_type', 'room_nymber', 'block', 
+                    'sq_m', 'price_baht', 'stock_qty']
+
+def validate_chunk(df):
+    """Validate and convert one chunk of worksheet rows into catalog records"""
+    # Handle price_baht - convert to numeric
+    df['price_baht'] = pd.to_numeric(df['price_baht'], errors='coerce')
+    invalid_prices = df[df['price_baht'].isna()].index.tolist()
+    if invalid_prices:
+        print(f"⚠️ Invalid price values found in {len(invalid_prices)} rows. Setting to 0.")
+        df.loc[df['price_baht'].isna(), 'price_baht'] = 0
+        
+    # Handle stock_qty - convert to integer
+    df['stock_qty'] = pd.to_numeric(df['stock_qty'], errors='coerce')
+    df['stock_qty'] = df['stock_qty'].fillna(0).astype(int)
     
-    # Data validation and conversion
-    print("Validating and converting data types...")
+    # Ensure other fields are strings
+    string_cols = ['developer', 'project_name', 'room_type', 'room_nymber', 'block', 'sq_m']
+    for col in string_cols:
+        df[col] = df[col].astype(str)
+        
+    # Remove completely invalid rows (where critical fields are empty)
+    critical_cols = ['developer', 'project_name', 'room_type']
     
-    # Clean up data
-    try:
-        # Handle price_baht - convert to numeric
-        df['price_baht'] = pd.to_numeric(df['price_baht'], errors='coerce')
-        invalid_prices = df[df['price_baht'].isna()].index.tolist()
-        if invalid_prices:
-            print(f"⚠️ Invalid price values found in {len(invalid_prices)} rows. Setting to 0.")
-            df.loc[df['price_baht'].isna(), 'price_baht'] = 0
-            
-        # Handle stock_qty - convert to integer
-        df['stock_qty'] = pd.to_numeric(df['stock_qty'], errors='coerce')
-        df['stock_qty'] = df['stock_qty'].fillna(0).astype(int)
-        
-        # Ensure other fields are strings
-        string_cols = ['developer', 'project_name', 'room_type', 'room_nymber', 'block', 'sq_m']
-        for col in string_cols:
-            df[col] = df[col].astype(str)
-            
-        # Remove completely invalid rows (where critical fields are empty)
-        critical_cols = ['developer', 'project_name', 'room_type']
-        
-        # Filter out rows where any critical field is empty
-        invalid_mask = df[critical_cols].isna().any(axis=1) | (df[critical_cols] == '').any(axis=1)
-        if invalid_mask.any():
-            print(f"⚠️ Removing {invalid_mask.sum()} rows with missing critical data")
-            df = df[~invalid_mask]
-            
-        # Drop any columns that are not in our catalog schema
-        extra_columns = [col for col in df.columns if col not in required_columns + ['id', 'updated_at']]
-        if extra_columns:
-            print(f"⚠️ Ignoring extra columns: {', '.join(extra_columns)}")
-            df = df.drop(columns=extra_columns)
-            
-    except Exception as e:
-        print(f"❌ ERROR during data validation: {str(e)}. Skipping worksheet.")
-        return False
+    # Filter out rows where any critical field is empty
+    invalid_mask = df[critical_cols].isna().any(axis=1) | (df[critical_cols] == '').any(axis=1)
+    if invalid_mask.any():
+        print(f"⚠️ Removing {invalid_mask.sum()} rows with missing critical data")
+        df = df[~invalid_mask]
         
+    # Drop any columns that are not in our catalog schema
+    extra_columns = [col for col in df.columns if col not in REQUIRED_COLUMNS + ['id', 'updated_at']]
+    if extra_columns:
+        print(f"⚠️ Ignoring extra columns: {', '.join(extra_columns)}")
+        df = df.drop(columns=extra_columns)
+    
     # Prepare data for upsert - handle id field if present
     if 'id' in df.columns:
         # Keep only valid UUIDs
-        valid_uuid_mask = df['id'].str.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', na=False)
+        valid_uuid_mask = df['id'].astype(str).str.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', na=False)
         if (~valid_uuid_mask).any():
             print(f"⚠️ Removing invalid UUID values from {(~valid_uuid_mask).sum()} rows")
             df.loc[~valid_uuid_mask, 'id'] = np.nan
@@ -84,24 +162,326 @@ def process_worksheet(worksheet, supabase):
     if 'updated_at' in df.columns:
         df = df.drop(columns=['updated_at'])
     
-    # Convert to records for upsert
-    records = df.to_dict('records')
+    return df
+
+def process_worksheet(worksheet, supabase, journal, file_id, modified_time, chunk_size=DEFAULT_CHUNK_ROWS):
+    """
+    Process a single worksheet and import its data to Supabase
+
+    Rows are read in ranges of chunk_size and each range is validated and
+    upserted before the next one is fetched. Every upserted range is recorded in
+    the journal, and a worksheet interrupted by a failure or crash resumes after
+    its last committed range.
+
+    Returns:
+        Number of rows upserted, 0 if the worksheet was skipped because of its
+        content, or None if it failed part way and should be retried.
+    """
+    print(f"Processing worksheet: {worksheet.title}")
     
-    if not records:
-        print("⚠️ No valid records found after validation. Skipping.")
-        return False
+    start_row, total_records = journal.committed_chunks(file_id, worksheet.title, modified_time)
+    if start_row > 2:
+        print(f"Resuming at row {start_row} ({total_records} rows already upserted)")
     
-    # Insert or update data in Supabase
-    print(f"Upserting {len(records)} rows to Supabase catalog table...")
-    try:
-        result = supabase.table('catalog').upsert(records).execute()
-        print(f"✅ Successfully imported {len(records)} rows to Supabase catalog table.")
-        return True
-    except Exception as e:
-        print(f"❌ ERROR during Supabase upsert: {str(e)}")
+    for chunk_start, chunk_end, chunk in iter_sheet_chunks(worksheet, chunk_size, start_row):
+        # Check if all required columns are present
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+        if missing_columns:
+            print(f"⚠️ Missing required columns: {', '.join(missing_columns)}. Skipping worksheet.")
+            return 0
+        
+        # Data validation and conversion
+        print(f"Validating and converting {len(chunk)} rows...")
+        try:
+            df = validate_chunk(chunk)
+        except Exception as e:
+            if total_records:
+                # Rows above this range are already in the catalog, so the worksheet is
+                # only partly imported and must not be recorded as done
+                print(f"❌ ERROR during data validation at row {chunk_start}: {str(e)}")
+                return None
+            print(f"❌ ERROR during data validation: {str(e)}. Skipping worksheet.")
+            return 0
+        
+        # Convert to records for upsert
+        records = df.to_dict('records')
+        
+        # Insert or update data in Supabase
+        if records:
+            print(f"Upserting {len(records)} rows to Supabase catalog table...")
+            try:
+                supabase.table('catalog').upsert(records).execute()
+            except Exception as e:
+                print(f"❌ ERROR during Supabase upsert: {str(e)}")
+                return None
+            total_records += len(records)
+        
+        journal.record_chunk(file_id, worksheet.title, modified_time, chunk_start, chunk_end, len(records))
+    
+    if not total_records:
+        print("⚠️ Worksheet is empty or has no valid records. Skipping.")
+        return 0
+    
+    print(f"✅ Successfully imported {total_records} rows to Supabase catalog table.")
+    return total_records
+
+def process_file(file, sheets_client, supabase, journal):
+    """
+    Import every worksheet of a Drive file
+
+    Worksheets already recorded in the journal for the file's current modifiedTime
+    are skipped. A file is ready to delete once every worksheet has been recorded
+    and at least one of them imported rows; otherwise it is left in place so the
+    failed worksheets are retried on the next run.
+
+    Returns:
+        True if the file was fully imported and can be deleted, False if it had
+        nothing to import, or None if a worksheet failed and the file should be retried
+    """
+    file_id = file['id']
+    modified_time = file.get('modifiedTime', '')
+    
+    # Open the spreadsheet
+    spreadsheet = sheets_client.open_by_key(file_id)
+    worksheets = spreadsheet.worksheets()
+    
+    completed = journal.completed_worksheets(file_id, modified_time)
+    all_committed = True
+    
+    for worksheet in worksheets:
+        if worksheet.title in completed:
+            print(f"\nSkipping worksheet already imported: {worksheet.title} ({completed[worksheet.title]} rows)")
+            continue
+        
+        print(f"\nProcessing worksheet: {worksheet.title}")
+        rows_upserted = process_worksheet(worksheet, supabase, journal, file_id, modified_time)
+        if rows_upserted is None:
+            all_committed = False
+            continue
+        
+        journal.record_worksheet(file_id, worksheet.title, modified_time, rows_upserted)
+        completed[worksheet.title] = rows_upserted
+    
+    if not all_committed:
+        print(f"⚠️ Some worksheets failed in file: {file['name']}. Keeping it for the next run.")
+        return None
+    
+    if not any(completed.values()):
+        print(f"⚠️ No worksheets were successfully processed in file: {file['name']}")
         return False
+    
+    print(f"✅ Successfully processed file: {file['name']}")
+    return True
+
+def delete_files(files, drive_service):
+    """
+    Delete files in batch requests, returning how many are gone
+
+    A file that is already missing, e.g. deleted by a previous run that crashed
+    before finishing, counts as deleted.
+    """
+    batch = DriveBatch(drive_service)
+    for file in files:
+        batch.add(file['id'], drive_service.files().delete(fileId=file['id']))
+    
+    deleted_count = 0
+    names = {file['id']: file['name'] for file in files}
+    for file_id, (_, error) in batch.execute().items():
+        if error is None:
+            print(f"✅ Deleted: {names[file_id]}")
+        elif isinstance(error, HttpError) and error.resp.status == 404:
+            print(f"File already deleted: {names[file_id]}")
+        else:
+            print(f"❌ ERROR deleting file {names[file_id]}: {str(error)}")
+            continue
+        deleted_count += 1
+    return deleted_count
+
+SPREADSHEET_MIME_TYPE = 'application/vnd.google-apps.spreadsheet'
+PAGE_TOKEN_KEY = 'drive_changes_page_token'
+RETRY_FILES_KEY = 'watch_retry_files'
+
+def list_folder_sheets(drive_service, folder_id):
+    """List all Google Sheets in a folder, following nextPageToken"""
+    query = f"'{folder_id}' in parents and mimeType = '{SPREADSHEET_MIME_TYPE}' and trashed = false"
+    files = []
+    page_token = None
+    while True:
+        file_results = drive_service.files().list(
+            q=query,
+            spaces='drive',
+            fields='nextPageToken, files(id, name, modifiedTime)',
+            pageSize=1000,
+            pageToken=page_token
+        ).execute()
+        files.extend(file_results.get('files', []))
+        page_token = file_results.get('nextPageToken')
+        if not page_token:
+            return files
+
+def fetch_changes(drive_service, page_token):
+    """
+    Read all pages of the Drive change feed starting at page_token
+
+    Returns:
+        Tuple of (changes, new start page token to poll from next time)
+    """
+    changes = []
+    while True:
+        result = drive_service.changes().list(
+            pageToken=page_token,
+            spaces='drive',
+            fields='nextPageToken, newStartPageToken, '
+                   'changes(fileId, removed, file(id, name, mimeType, modifiedTime, parents, trashed))',
+            pageSize=1000
+        ).execute()
+        changes.extend(result.get('changes', []))
+        if 'newStartPageToken' in result:
+            return changes, result['newStartPageToken']
+        page_token = result['nextPageToken']
+
+def changed_folder_sheets(changes, folder_id):
+    """Reduce a change set to the latest version of each live Google Sheet in the folder"""
+    files = {}
+    for change in changes:
+        file = change.get('file')
+        if (change.get('removed') or not file or file.get('trashed')
+                or file.get('mimeType') != SPREADSHEET_MIME_TYPE
+                or folder_id not in file.get('parents', [])):
+            # A later change that removes or moves the file supersedes earlier ones
+            files.pop(change.get('fileId'), None)
+            continue
+        files[file['id']] = file
+    return list(files.values())
+
+def import_files(files, sheets_client, drive_service, supabase, journal):
+    """
+    Import each file and delete the fully imported ones
+
+    A file whose worksheets were imported by this run is deleted as soon as
+    process_file returns, together with any deletes still queued. Files whose
+    worksheets were all in the journal already, the backlog of a run that
+    crashed before deleting, need no import and are queued and sent in batches
+    of MAX_BATCH_SIZE instead of one request each.
+
+    Returns:
+        Tuple of (number of files deleted, files that failed and should be retried)
+    """
+    processed_count = 0
+    ready = []
+    failed = []
+    for file in files:
+        print(f"\n=== Processing file: {file['name']} ===")
+        
+        modified_time = file.get('modifiedTime', '')
+        journaled = len(journal.completed_worksheets(file['id'], modified_time))
+        try:
+            result = process_file(file, sheets_client, supabase, journal)
+        except Exception as e:
+            print(f"❌ ERROR processing file {file['name']}: {str(e)}")
+            result = None
+        
+        if result:
+            ready.append(file)
+        elif result is None:
+            failed.append(file)
+        
+        imported_now = result and len(journal.completed_worksheets(file['id'], modified_time)) > journaled
+        if ready and (imported_now or len(ready) >= MAX_BATCH_SIZE):
+            processed_count += delete_files(ready, drive_service)
+            ready = []
+    
+    if ready:
+        print(f"\n=== Deleting {len(ready)} successfully processed files ===")
+        processed_count += delete_files(ready, drive_service)
+    return processed_count, failed
+
+def watch_folder(folder_id, sheets_client, drive_service, supabase, journal,
+                 poll_interval=1.0, max_idle_interval=5.0, max_poll_interval=300.0,
+                 retry_interval=60.0):
+    """
+    Poll the Drive change feed and import new or modified sheets in the folder
+
+    The page token is stored in the journal, so a restarted watcher continues from
+    the last processed change. Without a stored token the watcher takes a fresh one
+    and imports the current folder contents once.
+
+    An idle feed stretches the wait up to max_idle_interval, so pickup stays within
+    seconds; only API errors back off exponentially up to max_poll_interval. Files
+    that failed to import are kept in the journal and retried every retry_interval
+    seconds until they succeed or change.
+    """
+    retry = {file['id']: file for file in json.loads(journal.get_state(RETRY_FILES_KEY) or '[]')}
+    
+    def handle(files):
+        _, failed = import_files(files, sheets_client, drive_service, supabase, journal)
+        for file in files:
+            retry.pop(file['id'], None)
+        for file in failed:
+            retry[file['id']] = file
+        journal.set_state(RETRY_FILES_KEY, json.dumps(list(retry.values())))
+    
+    page_token = journal.get_state(PAGE_TOKEN_KEY)
+    if page_token is None:
+        # Take the token before the scan so nothing added during the scan is missed
+        page_token = drive_service.changes().getStartPageToken().execute()['startPageToken']
+        files = list_folder_sheets(drive_service, folder_id)
+        print(f"Found {len(files)} Google Sheets in folder. Processing all files...")
+        handle(files)
+        journal.set_state(PAGE_TOKEN_KEY, page_token)
+    
+    print(f"Watching folder {folder_id} for changes...")
+    interval = poll_interval
+    error_interval = poll_interval
+    last_retry = time.monotonic()
+    while True:
+        try:
+            changes, new_page_token = fetch_changes(drive_service, page_token)
+        except Exception as e:
+            print(f"❌ ERROR reading Drive changes: {str(e)}")
+            error_interval = min(error_interval * 2, max_poll_interval)
+            time.sleep(error_interval)
+            continue
+        error_interval = poll_interval
+        
+        # A newer change supersedes a pending retry, including removal of the file
+        for change in changes:
+            if retry.pop(change.get('fileId'), None) is not None:
+                journal.set_state(RETRY_FILES_KEY, json.dumps(list(retry.values())))
+        
+        files = changed_folder_sheets(changes, folder_id)
+        if retry and time.monotonic() - last_retry >= retry_interval:
+            print(f"\nRetrying {len(retry)} sheets that failed to import.")
+            files.extend(retry.values())
+            last_retry = time.monotonic()
+        
+        if files:
+            print(f"\n{len(files)} new, modified or retried sheets in folder.")
+            handle(files)
+            interval = poll_interval
+        else:
+            interval = min(interval * 2, max_idle_interval)
+        
+        # Save the token only after the changes are handled; failed files stay in the retry set
+        page_token = new_page_token
+        journal.set_state(PAGE_TOKEN_KEY, page_token)
+        time.sleep(interval)
 
 def main():
+    parser = argparse.ArgumentParser(description='Import Google Sheets from MCP_sandbox_app into the catalog')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and import sheets as they appear via the Drive change feed')
+    parser.add_argument('--poll-interval', type=float, default=1.0,
+                        help='Seconds between change feed polls while changes keep arriving')
+    parser.add_argument('--max-idle-interval', type=float, default=5.0,
+                        help='Upper bound for the poll interval while the feed is idle')
+    parser.add_argument('--max-poll-interval', type=float, default=300.0,
+                        help='Upper bound for the poll backoff while the change feed fails')
+    parser.add_argument('--retry-interval', type=float, default=60.0,
+                        help='Seconds between retries of sheets that failed to import')
+    
+    args = parser.parse_args()
+    
     # Load environment variables
     load_dotenv()
     
@@ -139,17 +519,6 @@ def main():
     folder_id = folder_results['files'][0]['id']
     print(f"Found folder: {target_folder_name} (ID: {folder_id})")
     
-    # List all files in the folder (only Google Sheets)
-    query = f"'{folder_id}' in parents and mimeType = 'application/vnd.google-apps.spreadsheet'"
-    file_results = drive_service.files().list(q=query, spaces='drive').execute()
-    
-    files = file_results.get('files', [])
-    if not files:
-        print(f"No Google Sheets found in folder '{target_folder_name}'.")
-        return False
-    
-    print(f"Found {len(files)} Google Sheets in folder. Processing all files...")
-    
     # Connect to Supabase
     print("Connecting to Supabase...")
     supabase_url = os.getenv("SUPABASE_URL")
@@ -161,52 +530,35 @@ def main():
     
     supabase: Client = create_client(supabase_url, supabase_key)
     
-    # Process each file
-    successfully_processed_files = []
+    # Open the checkpoint journal so an interrupted run resumes where it stopped
+    journal_path = os.getenv("IMPORT_JOURNAL_PATH", "import_journal.sqlite3")
+    print(f"Using import journal at {journal_path}")
+    journal = ImportJournal(journal_path)
     
-    for file in files:
-        print(f"\n=== Processing file: {file['name']} ===")
-        file_id = file['id']
+    try:
+        if args.watch:
+            watch_folder(folder_id, sheets_client, drive_service, supabase, journal,
+                         args.poll_interval, args.max_idle_interval, args.max_poll_interval,
+                         args.retry_interval)
+            return True
         
-        try:
-            # Open the spreadsheet
-            spreadsheet = sheets_client.open_by_key(file_id)
-            worksheets = spreadsheet.worksheets()
-            
-            # Process all worksheets in the file
-            file_success = False
-            
-            for worksheet in worksheets:
-                print(f"\nProcessing worksheet: {worksheet.title}")
-                worksheet_success = process_worksheet(worksheet, supabase)
-                if worksheet_success:
-                    file_success = True
-            
-            if file_success:
-                print(f"✅ Successfully processed file: {file['name']}")
-                successfully_processed_files.append(file)
-            else:
-                print(f"⚠️ No worksheets were successfully processed in file: {file['name']}")
-                
-        except Exception as e:
-            print(f"❌ ERROR processing file {file['name']}: {str(e)}")
-    
-    # Delete successfully processed files
-    if successfully_processed_files:
-        print(f"\n=== Deleting {len(successfully_processed_files)} successfully processed files ===")
+        # List all files in the folder (only Google Sheets)
+        files = list_folder_sheets(drive_service, folder_id)
+        if not files:
+            print(f"No Google Sheets found in folder '{target_folder_name}'.")
+            return False
         
-        for file in successfully_processed_files:
-            try:
-                drive_service.files().delete(fileId=file['id']).execute()
-                print(f"✅ Deleted: {file['name']}")
-            except Exception as e:
-                print(f"❌ ERROR deleting file {file['name']}: {str(e)}")
-                
-        print(f"\n✅ Processed and deleted {len(successfully_processed_files)} files")
+        print(f"Found {len(files)} Google Sheets in folder. Processing all files...")
+        processed_count, _ = import_files(files, sheets_client, drive_service, supabase, journal)
+    finally:
+        journal.close()
+    
+    if processed_count:
+        print(f"\n✅ Processed and deleted {processed_count} files")
     else:
         print("\n⚠️ No files were successfully processed. Nothing to delete.")
     
     return True
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
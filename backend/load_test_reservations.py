@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import os
+import sys
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import httpx
+from dotenv import load_dotenv
+from supabase import create_client, Client
+
+def get_stock(supabase, unit_id):
+    response = supabase.table("catalog").select("stock_qty").eq("id", unit_id).execute()
+    if not response.data:
+        raise ValueError(f"Unit {unit_id} not found in catalog")
+    return response.data[0]["stock_qty"]
+
+def reserve_rpc(supabase, unit_id, qty):
+    """Reserve qty of one unit through the RPC, returning (reserved, latency in seconds)"""
+    start = time.perf_counter()
+    response = supabase.rpc("reserve_stock", {"items": [{"id": unit_id, "qty": qty}]}).execute()
+    return response.data[0]["reserved"], time.perf_counter() - start
+
+def reserve_api(client, unit_id, qty):
+    """Reserve qty of one unit through POST /api/catalog/reserve, returning (reserved, latency in seconds)"""
+    start = time.perf_counter()
+    response = client.post("/api/catalog/reserve", json={"items": [{"id": unit_id, "qty": qty}]})
+    response.raise_for_status()
+    return response.json()["results"][0]["reserved"], time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test concurrent stock reservations')
+    parser.add_argument('--unit-id', required=True, help='Catalog id of the unit to reserve')
+    parser.add_argument('--requests', type=int, default=2000, help='Number of reservations to send')
+    parser.add_argument('--workers', type=int, default=64, help='Concurrent clients')
+    parser.add_argument('--qty', type=int, default=1, help='Units per reservation')
+    parser.add_argument('--restore', action='store_true', help='Put the original stock back afterwards')
+    parser.add_argument('--target', choices=['api', 'rpc'], default='api',
+                        help='Reserve through the API endpoint or call the reserve_stock RPC directly')
+    parser.add_argument('--api-url', default='http://localhost:8000', help='Base URL of the API for --target api')
+
+    args = parser.parse_args()
+
+    # Load environment variables
+    load_dotenv()
+
+    supabase_url = os.getenv("SUPABASE_URL")
+    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+
+    if not supabase_url or not supabase_key:
+        print("❌ ERROR: Supabase credentials not found in environment variables.")
+        return 1
+
+    supabase: Client = create_client(supabase_url, supabase_key)
+
+    stock_before = get_stock(supabase, args.unit_id)
+    expected = min(args.requests, stock_before // args.qty)
+    print(f"Stock before: {stock_before}. Sending {args.requests} reservations of {args.qty} "
+          f"to the {args.target} with {args.workers} workers (expecting {expected} to succeed)...")
+
+    if args.target == 'api':
+        client = httpx.Client(
+            base_url=args.api_url,
+            limits=httpx.Limits(max_connections=args.workers),
+            timeout=30
+        )
+        reserve = partial(reserve_api, client, args.unit_id, args.qty)
+    else:
+        client = None
+        reserve = partial(reserve_rpc, supabase, args.unit_id, args.qty)
+
+    started = time.perf_counter()
+    errors = 0
+    results = []
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = [executor.submit(reserve) for _ in range(args.requests)]
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                errors += 1
+                print(f"❌ ERROR: Reservation failed: {str(e)}")
+    elapsed = time.perf_counter() - started
+    if client is not None:
+        client.close()
+
+    stock_after = get_stock(supabase, args.unit_id)
+    succeeded = sum(1 for reserved, _ in results if reserved)
+    latencies = sorted(latency for _, latency in results)
+
+    print("\n=== Load Test Results ===")
+    print(f"Succeeded: {succeeded}, rejected: {len(results) - succeeded}, errors: {errors}")
+    print(f"Stock after: {stock_after}")
+    print(f"Throughput: {len(results) / elapsed:.0f} reservations/s")
+    if latencies:
+        print(f"Latency p50: {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+    if args.restore:
+        supabase.table("catalog").update({"stock_qty": stock_before}).eq("id", args.unit_id).execute()
+        print(f"Restored stock to {stock_before}")
+
+    if stock_after < 0 or succeeded * args.qty > stock_before:
+        print("❌ Oversell: more stock was reserved than was available.")
+        return 1
+    if errors:
+        # A request that errored client-side may still have committed
+        print("⚠️ No oversell, but some requests errored; stock may differ by their amount.")
+        return 1
+    if stock_before - stock_after != succeeded * args.qty or succeeded != expected:
+        print("❌ Stock does not match the successful reservations.")
+        return 1
+    print("✅ No oversell: stock decreased by exactly the reserved amount.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,28 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from api.import_catalog import router as import_router
+from api.catalog import router as catalog_router, poll_catalog
+from api.import_catalog import router as import_router, shutdown_parse_executor, write_buffer
 
-app = FastAPI(title="WB Analytics API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Keep the in-memory catalog index loaded and refreshed in the background
+    poller = asyncio.create_task(poll_catalog())
+    flusher = asyncio.create_task(write_buffer.run()) if write_buffer is not None else None
+    yield
+    poller.cancel()
+    try:
+        if flusher is not None:
+            # Write out anything still buffered before the process exits
+            flusher.cancel()
+            await run_in_threadpool(write_buffer.flush)
+    finally:
+        await run_in_threadpool(shutdown_parse_executor)
+
+app = FastAPI(title="WB Analytics API", lifespan=lifespan, default_response_class=ORJSONResponse)
 
 # Configure CORS
 app.add_middleware(
@@ -14,4 +34,5 @@ app.add_middleware(
 )
 
 # Include routers
-app.include_router(import_router, prefix="/api", tags=["import"]) 
\ No newline at end of file
+app.include_router(import_router, prefix="/api", tags=["import"])
+app.include_router(catalog_router, prefix="/api", tags=["catalog"])
@@ -6,6 +6,7 @@ from supabase import create_client, Client
 from google.oauth2.service_account import Credentials
 import gspread
 from googleapiclient.discovery import build
+from api.drive_batch import DriveBatch
 from datetime import datetime
 
 def main():
@@ -117,6 +118,14 @@ def main():
         
         folder_id = None
         
+        # Permissions are queued and sent together in one batch request
+        permission = {
+            'type': 'user',
+            'role': 'writer',
+            'emailAddress': YOUR_EMAIL
+        }
+        shares = DriveBatch(drive_service)
+        
         if not folder_results.get('files', []):
             print(f"Folder '{target_folder_name}' not found. Creating it...")
             
@@ -132,51 +141,38 @@ def main():
             print(f"✅ Created folder: {target_folder_name} (ID: {folder_id})")
             
             # Share the folder with the user
-            print(f"Sharing folder with {YOUR_EMAIL}...")
-            permission = {
-                'type': 'user',
-                'role': 'writer',
-                'emailAddress': YOUR_EMAIL
-            }
-            drive_service.permissions().create(
+            shares.add('folder', drive_service.permissions().create(
                 fileId=folder_id,
                 body=permission,
                 fields='id',
                 sendNotificationEmail=True
-            ).execute()
-            print(f"✅ Folder shared with {YOUR_EMAIL}")
+            ))
         else:
             folder_id = folder_results['files'][0]['id']
             print(f"Found folder: {target_folder_name} (ID: {folder_id})")
         
-        # Create the spreadsheet
-        spreadsheet = sheets_client.create(sheet_name)
-        
-        # Share the spreadsheet with the user immediately after creation
-        print(f"Sharing spreadsheet with {YOUR_EMAIL}...")
-        file_id = spreadsheet.id
-        permission = {
-            'type': 'user',
-            'role': 'writer',
-            'emailAddress': YOUR_EMAIL
+        # Create the spreadsheet directly inside the folder, so no move is needed
+        spreadsheet_metadata = {
+            'name': sheet_name,
+            'mimeType': 'application/vnd.google-apps.spreadsheet',
+            'parents': [folder_id]
         }
-        drive_service.permissions().create(
+        file_id = drive_service.files().create(body=spreadsheet_metadata, fields='id').execute()['id']
+        spreadsheet = sheets_client.open_by_key(file_id)
+        print(f"Created spreadsheet in '{target_folder_name}' folder.")
+        
+        # Share the spreadsheet (and the new folder, if any) with the user
+        print(f"Sharing with {YOUR_EMAIL}...")
+        shares.add('spreadsheet', drive_service.permissions().create(
             fileId=file_id,
             body=permission,
             fields='id',
             sendNotificationEmail=True
-        ).execute()
-        print(f"✅ Spreadsheet shared with {YOUR_EMAIL}")
-        
-        if folder_id:
-            # Move the spreadsheet to the folder
-            drive_service.files().update(
-                fileId=file_id,
-                addParents=folder_id,
-                removeParents='root'
-            ).execute()
-            
-            print(f"Moved spreadsheet to '{target_folder_name}' folder.")
+        ))
+        for item, (_, error) in shares.execute().items():
+            if error is not None:
+                raise Exception(f"Failed to share {item}: {str(error)}")
+            print(f"✅ {item.capitalize()} shared with {YOUR_EMAIL}")
         
         # Get the first worksheet
         worksheet = spreadsheet.get_worksheet(0)
@@ -0,0 +1,6 @@
+import os
+
+# The API modules create their Supabase client on import; point it at a local
+# project so they import without real credentials. Tests replace the client.
+os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoic2VydmljZV9yb2xlIn0.test")
@@ -0,0 +1,162 @@
+import asyncio
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api import catalog
+
+class StopPolling(Exception):
+    pass
+
+class RecordingIndex:
+    def __init__(self):
+        self.calls = []
+
+    def load(self):
+        self.calls.append('load')
+
+    def refresh(self):
+        self.calls.append('refresh')
+
+def poll(monkeypatch, polls, **kwargs):
+    index = RecordingIndex()
+    sleeps = []
+
+    async def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == polls:
+            raise StopPolling()
+
+    monkeypatch.setattr(catalog, 'catalog_index', index)
+    monkeypatch.setattr(catalog.asyncio, 'sleep', sleep)
+    with pytest.raises(StopPolling):
+        asyncio.run(catalog.poll_catalog(interval=10, **kwargs))
+    return index.calls
+
+def test_poll_catalog_loads_once_then_refreshes(monkeypatch):
+    assert poll(monkeypatch, 3, reload_interval=3600) == ['load', 'refresh', 'refresh']
+
+def test_poll_catalog_reloads_when_due(monkeypatch):
+    # A full load drops rows deleted from the table
+    assert poll(monkeypatch, 3, reload_interval=0) == ['load', 'load', 'load']
+
+UNIT_A = '00000000-0000-0000-0000-00000000000a'
+UNIT_B = '00000000-0000-0000-0000-00000000000b'
+
+class FakeRpc:
+    def __init__(self, client, name, params):
+        self.client = client
+        self.params = params
+        self.client.calls.append((name, params))
+
+    def execute(self):
+        if self.client.error is not None:
+            raise self.client.error
+        rows = self.client.rows
+        if 'p_limit' in self.params:
+            # History functions page by the cursor of the last row read
+            after = (self.params.get('p_after_id'), self.params.get('p_after_time'))
+            if after[0] is not None:
+                rows = [row for row in rows if (row['catalog_id'], row.get('changed_at')) > after]
+            rows = rows[:self.params['p_limit']]
+        return type('Response', (), {'data': rows})
+
+class FakeSupabase:
+    def __init__(self, rows=(), error=None):
+        self.rows = list(rows)
+        self.error = error
+        self.calls = []
+
+    def rpc(self, name, params):
+        return FakeRpc(self, name, params)
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(catalog.router, prefix="/api")
+    return TestClient(app)
+
+def test_reserve_maps_rpc_rows(monkeypatch, client):
+    supabase = FakeSupabase([
+        {'unit_id': UNIT_A, 'requested_qty': 3, 'reserved': True, 'remaining_qty': 7},
+        {'unit_id': UNIT_B, 'requested_qty': 1, 'reserved': False, 'remaining_qty': 0},
+    ])
+    monkeypatch.setattr(catalog, 'supabase', supabase)
+
+    response = client.post('/api/catalog/reserve', json={'items': [
+        {'id': UNIT_A, 'qty': 2}, {'id': UNIT_A}, {'id': UNIT_B},
+    ]})
+
+    assert response.status_code == 200
+    assert supabase.calls == [('reserve_stock', {'items': [
+        {'id': UNIT_A, 'qty': 2}, {'id': UNIT_A, 'qty': 1}, {'id': UNIT_B, 'qty': 1},
+    ]})]
+    assert response.json() == {
+        'success': False,
+        'results': [
+            {'id': UNIT_A, 'requested': 3, 'reserved': True, 'stock_qty': 7},
+            {'id': UNIT_B, 'requested': 1, 'reserved': False, 'stock_qty': 0},
+        ]
+    }
+
+def test_reserve_succeeds_when_every_unit_is_reserved(monkeypatch, client):
+    monkeypatch.setattr(catalog, 'supabase', FakeSupabase([
+        {'unit_id': UNIT_A, 'requested_qty': 1, 'reserved': True, 'remaining_qty': 4},
+    ]))
+
+    assert client.post('/api/catalog/reserve', json={'items': [{'id': UNIT_A}]}).json()['success'] is True
+
+@pytest.mark.parametrize('body', [
+    {'items': []},
+    {'items': [{'id': 'not-a-uuid'}]},
+    {'items': [{'id': UNIT_A, 'qty': 0}]},
+    {},
+])
+def test_reserve_rejects_invalid_requests(monkeypatch, client, body):
+    supabase = FakeSupabase()
+    monkeypatch.setattr(catalog, 'supabase', supabase)
+
+    assert client.post('/api/catalog/reserve', json=body).status_code == 422
+    assert supabase.calls == []
+
+def test_reserve_reports_rpc_failure(monkeypatch, client):
+    monkeypatch.setattr(catalog, 'supabase', FakeSupabase(error=ConnectionError('database unavailable')))
+
+    response = client.post('/api/catalog/reserve', json={'items': [{'id': UNIT_A}]})
+
+    assert response.status_code == 500
+    assert response.json()['detail'] == 'database unavailable'
+
+def test_history_reads_every_page(monkeypatch, client):
+    monkeypatch.setattr(catalog, 'HISTORY_PAGE_SIZE', 2)
+    rows = [{'catalog_id': f'00000000-0000-0000-0000-00000000000{n}', 'price_baht': n} for n in range(5)]
+    supabase = FakeSupabase(rows)
+    monkeypatch.setattr(catalog, 'supabase', supabase)
+
+    response = client.get('/api/catalog/history', params={'as_of': '2024-03-01T00:00:00Z', 'unit_id': UNIT_A})
+
+    assert response.json()['rows'] == rows
+    assert [params.get('p_after_id') for name, params in supabase.calls] == [
+        None, rows[1]['catalog_id'], rows[3]['catalog_id']
+    ]
+
+def test_series_pages_by_unit_and_time(monkeypatch, client):
+    monkeypatch.setattr(catalog, 'HISTORY_PAGE_SIZE', 2)
+    points = [
+        {'catalog_id': unit_id, 'changed_at': f'2024-03-0{day}T00:00:00+00:00', 'price_baht': day}
+        for unit_id in (UNIT_A, UNIT_B) for day in (1, 2, 3)
+    ]
+    supabase = FakeSupabase(points)
+    monkeypatch.setattr(catalog, 'supabase', supabase)
+
+    response = client.get('/api/catalog/history/series', params={
+        'start': '2024-03-01T00:00:00Z', 'developer': 'Dev', 'project_name': 'Project'
+    })
+
+    assert response.json()['points'] == points
+    # A full last page costs one more call that comes back empty
+    assert [(params.get('p_after_id'), params.get('p_after_time')) for name, params in supabase.calls] == [
+        (None, None),
+        (UNIT_A, points[1]['changed_at']),
+        (UNIT_B, points[3]['changed_at']),
+        (UNIT_B, points[5]['changed_at']),
+    ]
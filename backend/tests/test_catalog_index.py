@@ -0,0 +1,119 @@
+import re
+from api import catalog_index
+from api.catalog_index import CatalogIndex
+
+def listing(row_id, developer, project_name, updated_at='2024-03-01T00:00:00+00:00', price=1000000.0):
+    return {
+        'id': row_id, 'developer': developer, 'project_name': project_name, 'room_type': 'Studio',
+        'room_nymber': '101', 'block': 'A', 'sq_m': '30', 'price_baht': price, 'stock_qty': 1,
+        'updated_at': updated_at
+    }
+
+def test_search_survives_strings_interned_during_search():
+    index = CatalogIndex(None)
+    index.snapshot = index._build([listing('1', 'Sansiri', 'Seaside')])
+    search = index.search_terms.search
+
+    def search_while_refreshing(text, *args):
+        # A concurrent refresh interns a new matching string while the query runs
+        index.strings.code('Seaside Grand')
+        return search(text, *args)
+
+    index.search_terms.search = search_while_refreshing
+
+    results = index.search('seaside')
+
+    assert [row['id'] for row in results] == ['1']
+
+class FakeQuery:
+    """Just enough of the PostgREST query builder for CatalogIndex._fetch"""
+
+    def __init__(self, client):
+        self.client = client
+        self.rows = list(client.rows)
+
+    def select(self, columns):
+        return self
+
+    def gte(self, column, value):
+        self.rows = [row for row in self.rows if row[column] >= value]
+        return self
+
+    def or_(self, filters):
+        updated_at, row_id = re.fullmatch(
+            r'updated_at\.gt\."(.+)",and\(updated_at\.eq\."\1",id\.gt\.(.+)\)', filters
+        ).groups()
+        self.rows = [row for row in self.rows if (row['updated_at'], row['id']) > (updated_at, row_id)]
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, count):
+        self.rows = sorted(self.rows, key=lambda row: (row['updated_at'], row['id']))[:count]
+        return self
+
+    def execute(self):
+        self.client.pages += 1
+        if self.client.on_page is not None:
+            self.client.on_page(self.client)
+        return type('Response', (), {'data': self.rows})
+
+class FakeSupabase:
+    def __init__(self, rows, on_page=None):
+        self.rows = rows
+        self.pages = 0
+        self.on_page = on_page
+
+    def table(self, name):
+        return FakeQuery(self)
+
+def test_version_is_derived_from_the_data():
+    rows = [listing('1', 'Sansiri', 'Seaside'), listing('2', 'Sansiri', 'Seaside')]
+    first, second = CatalogIndex(FakeSupabase(rows)), CatalogIndex(FakeSupabase(list(reversed(rows))))
+    assert first.version() == 'empty'
+
+    first.load()
+    second.load()
+
+    # Another worker or a restarted process serving the same rows agrees
+    assert first.version() == second.version()
+
+def test_version_changes_with_the_rows():
+    supabase = FakeSupabase([
+        listing('1', 'Sansiri', 'Seaside', '2024-03-01T00:00:05+00:00'),
+        listing('2', 'Sansiri', 'Seaside', '2024-03-01T00:00:01+00:00'),
+    ])
+    index = CatalogIndex(supabase)
+    index.load()
+    loaded = index.version()
+
+    # An update committed late with an earlier updated_at keeps both the row
+    # count and the max updated_at, but must still change the version
+    supabase.rows[1] = listing('2', 'Sansiri', 'Seaside', '2024-03-01T00:00:03+00:00', price=900000.0)
+    assert index.refresh() == 1
+    refreshed = index.version()
+    assert refreshed != loaded
+
+    assert index.refresh() == 0
+    assert index.version() == refreshed
+
+def test_load_does_not_skip_rows_when_a_row_moves_mid_read(monkeypatch):
+    monkeypatch.setattr(catalog_index, 'FETCH_PAGE_SIZE', 2)
+
+    def update_first_row_after_first_page(client):
+        # Offset paging would now skip "3", which shifts into the first page
+        if client.pages == 1:
+            client.rows[0] = listing('1', 'Sansiri', 'Seaside', '2024-03-01T00:00:09+00:00', price=1.0)
+
+    supabase = FakeSupabase(
+        [listing(str(n), 'Sansiri', 'Seaside', f'2024-03-01T00:00:0{n}+00:00') for n in range(1, 6)],
+        on_page=update_first_row_after_first_page
+    )
+    index = CatalogIndex(supabase)
+
+    assert index.load() == 5
+    assert sorted(index.snapshot.ids) == ['1', '2', '3', '4', '5']
+    # The row read twice keeps its newer version
+    total, rows = index.query(max_price=1.0)
+    assert [row['id'] for row in rows] == ['1']
@@ -0,0 +1,175 @@
+import json
+import re
+import threading
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import httplib2
+import pytest
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from api import drive_batch
+from api.drive_batch import DriveBatch
+import import_all_and_delete as importer
+
+REASONS = {204: 'No Content', 403: 'Forbidden', 404: 'Not Found', 429: 'Too Many Requests', 503: 'Service Unavailable'}
+
+class FakeBatchServer(HTTPServer):
+    """
+    Local stand-in for the Google batch endpoint
+
+    Each inner DELETE is answered with the next status queued for its file id in
+    statuses, or 204 once the queue is empty.
+    """
+
+    def __init__(self, statuses):
+        super().__init__(('127.0.0.1', 0), FakeBatchHandler)
+        self.statuses = {file_id: list(queue) for file_id, queue in statuses.items()}
+        self.batches = []
+
+    @property
+    def uri(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/batch/drive/v3"
+
+    def next_status(self, file_id):
+        queue = self.statuses.get(file_id)
+        return queue.pop(0) if queue else 204
+
+class FakeBatchHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        message = BytesParser().parsebytes(
+            f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+
+        boundary = 'batch_response'
+        parts = []
+        file_ids = []
+        for part in message.get_payload():
+            content_id = part['Content-ID'].strip('<>')
+            file_id = re.match(rb'DELETE /drive/v3/files/([^?\s]+)', part.get_payload(decode=True)).group(1).decode()
+            file_ids.append(file_id)
+
+            status = self.server.next_status(file_id)
+            inner = f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+            if status == 204:
+                inner += "Content-Length: 0\r\n\r\n"
+            else:
+                error = {'error': {'code': status, 'message': REASONS[status], 'errors': [{'reason': 'fake'}]}}
+                inner += f"Content-Type: application/json\r\n\r\n{json.dumps(error)}"
+            parts.append(
+                f"--{boundary}\r\nContent-Type: application/http\r\n"
+                f"Content-ID: <response-{content_id}>\r\n\r\n{inner}\r\n"
+            )
+        self.server.batches.append(file_ids)
+
+        payload = (''.join(parts) + f"--{boundary}--\r\n").encode()
+        self.send_response(200)
+        self.send_header('Content-Type', f'multipart/mixed; boundary={boundary}')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def drive_service():
+    return build('drive', 'v3', http=httplib2.Http(), static_discovery=True)
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(statuses=None):
+        server = FakeBatchServer(statuses or {})
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(drive_batch.time, 'sleep', sleeps.append)
+    return sleeps
+
+def queue_deletes(batch, drive_service, file_ids):
+    for file_id in file_ids:
+        batch.add(file_id, drive_service.files().delete(fileId=file_id))
+
+def test_reports_each_item_separately(drive_service, serve, sleeps):
+    server = serve({'missing': [404], 'locked': [403]})
+    batch = DriveBatch(drive_service, batch_uri=server.uri)
+    queue_deletes(batch, drive_service, ['ok', 'missing', 'locked'])
+
+    results = batch.execute()
+
+    assert results['ok'][1] is None
+    assert isinstance(results['missing'][1], HttpError) and results['missing'][1].resp.status == 404
+    assert isinstance(results['locked'][1], HttpError) and results['locked'][1].resp.status == 403
+    # Client errors are final, so everything went out in one batch without retries
+    assert server.batches == [['ok', 'missing', 'locked']]
+    assert sleeps == []
+    assert len(batch) == 0
+
+def test_retries_only_rate_limited_and_server_errors(drive_service, serve, sleeps):
+    server = serve({'throttled': [429], 'flaky': [503, 503], 'missing': [404]})
+    batch = DriveBatch(drive_service, batch_uri=server.uri)
+    queue_deletes(batch, drive_service, ['ok', 'throttled', 'flaky', 'missing'])
+
+    results = batch.execute()
+
+    assert all(results[file_id][1] is None for file_id in ('ok', 'throttled', 'flaky'))
+    assert results['missing'][1].resp.status == 404
+    assert server.batches == [['ok', 'throttled', 'flaky', 'missing'], ['throttled', 'flaky'], ['flaky']]
+    assert len(sleeps) == 2 and 1 <= sleeps[0] < 2 and 2 <= sleeps[1] < 3
+
+def test_gives_up_after_max_retries(drive_service, serve, sleeps):
+    server = serve({'throttled': [429] * 5})
+    batch = DriveBatch(drive_service, max_retries=2, batch_uri=server.uri)
+    queue_deletes(batch, drive_service, ['throttled'])
+
+    results = batch.execute()
+
+    assert results['throttled'][1].resp.status == 429
+    assert len(server.batches) == 3
+
+def test_splits_into_batches_of_max_size(drive_service, serve, sleeps):
+    server = serve()
+    batch = DriveBatch(drive_service, batch_uri=server.uri)
+    file_ids = [f'file{number}' for number in range(drive_batch.MAX_BATCH_SIZE + 1)]
+    queue_deletes(batch, drive_service, file_ids)
+
+    results = batch.execute()
+
+    assert len(results) == len(file_ids)
+    assert [len(file_ids) for file_ids in server.batches] == [drive_batch.MAX_BATCH_SIZE, 1]
+
+def test_import_files_deletes_fresh_imports_right_away(monkeypatch, tmp_path):
+    journal = importer.ImportJournal(str(tmp_path / 'journal.sqlite3'))
+    # a and b were imported by a run that crashed before deleting them
+    for file_id in ('a', 'b'):
+        journal.record_worksheet(file_id, 'Units', '', 10)
+    deleted = []
+
+    def process_file(file, sheets_client, supabase, journal):
+        deleted.append(f"processed {file['id']}")
+        journal.record_worksheet(file['id'], 'Units', '', 10)
+        return True
+
+    monkeypatch.setattr(importer, 'process_file', process_file)
+    monkeypatch.setattr(importer, 'delete_files', lambda files, drive: deleted.append([f['id'] for f in files]) or len(files))
+    files = [{'id': file_id, 'name': file_id} for file_id in ('a', 'b', 'c', 'd', 'e')]
+    journal.record_worksheet('e', 'Units', '', 10)
+
+    assert importer.import_files(files, None, None, None, journal) == (5, [])
+    # The backlog rides along with the first fresh delete; c and d do not wait for later files
+    assert deleted == [
+        'processed a', 'processed b', 'processed c', ['a', 'b', 'c'],
+        'processed d', ['d'], 'processed e', ['e']
+    ]
+    journal.close()
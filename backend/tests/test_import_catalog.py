@@ -0,0 +1,165 @@
+import os
+import pytest
+from postgrest.exceptions import APIError
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from api import import_catalog
+from api.catalog_validation import try_parse_catalog_csv
+from api.import_catalog import _upsert_merged, router
+from api.write_buffer import WriteBehindBuffer
+
+ID_A = '00000000-0000-0000-0000-00000000000a'
+ID_B = '00000000-0000-0000-0000-00000000000b'
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, records):
+        self.records = records
+        return self
+
+    def execute(self):
+        ids = [record['id'] for record in self.records if 'id' in record]
+        if len(ids) != len(set(ids)):
+            # What Postgres reports for a duplicate key within one INSERT ... ON CONFLICT
+            raise Exception('ON CONFLICT DO UPDATE command cannot affect row a second time')
+        if self.client.fail:
+            raise ConnectionError('upsert failed')
+        if any(record.get('price_baht') != record.get('price_baht') for record in self.records):
+            # PostgREST rejects the NaN literal as invalid JSON
+            raise APIError({'code': 'PGRST102', 'message': 'Empty or invalid json'})
+        self.client.upserts.append(self.records)
+
+class FakeSupabase:
+    def __init__(self, fail=False):
+        self.upserts = []
+        self.fail = fail
+
+    def table(self, name):
+        return FakeTable(self)
+
+def unit(room, price, unit_id=None):
+    record = {'developer': 'Dev', 'project_name': 'Project', 'room_nymber': room, 'price_baht': price}
+    if unit_id is not None:
+        record['id'] = unit_id
+    return record
+
+@pytest.fixture
+def supabase(monkeypatch):
+    client = FakeSupabase()
+    monkeypatch.setattr(import_catalog, 'supabase', client)
+    return client
+
+def test_same_id_in_several_files_is_upserted_once_last_file_wins(supabase):
+    results = _upsert_merged({
+        0: [unit('101', 100, ID_A), unit('102', 200, ID_B)],
+        1: [unit('101', 150, ID_A)],
+    })
+
+    assert supabase.upserts == [[unit('101', 150, ID_A), unit('102', 200, ID_B)]]
+    assert results == {0: {"inserted": 2, "error": None}, 1: {"inserted": 1, "error": None}}
+
+def test_same_id_within_one_file_keeps_last_row(supabase):
+    _upsert_merged({0: [unit('101', 100, ID_A), unit('101', 120, ID_A)]})
+
+    assert supabase.upserts == [[unit('101', 120, ID_A)]]
+
+def test_rows_without_id_are_all_kept(supabase):
+    results = _upsert_merged({0: [unit('101', 100)], 1: [unit('101', 100)]})
+
+    assert supabase.upserts == [[unit('101', 100), unit('101', 100)]]
+    assert results[0]["inserted"] == results[1]["inserted"] == 1
+
+def test_failed_batch_fails_every_file_sharing_a_row(supabase):
+    supabase.fail = True
+
+    results = _upsert_merged({0: [unit('101', 100, ID_A)], 1: [unit('101', 150, ID_A)]})
+
+    assert results == {
+        0: {"inserted": 0, "error": 'upsert failed'},
+        1: {"inserted": 0, "error": 'upsert failed'},
+    }
+
+def test_parse_executor_uses_forkserver_sized_to_affinity():
+    executor = import_catalog._get_parse_executor()
+    try:
+        assert executor._mp_context.get_start_method() == 'forkserver'
+        assert executor._max_workers == len(os.sched_getaffinity(0))
+        assert executor.submit(try_parse_catalog_csv, catalog_csv((ID_A, 100))).result()[1] is None
+    finally:
+        import_catalog.shutdown_parse_executor()
+
+def test_shutdown_parse_executor_stops_workers():
+    executor = import_catalog._get_parse_executor()
+
+    import_catalog.shutdown_parse_executor()
+
+    assert import_catalog._parse_executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(len, b'')
+
+def catalog_csv(*rows):
+    lines = ['id,developer,project_name,room_type,room_nymber,block,sq_m,price_baht,stock_qty']
+    lines += [f'{unit_id},Dev,Project,Studio,101,A,30,{price},1' for unit_id, price in rows]
+    return '\n'.join(lines).encode()
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.include_router(router, prefix="/api")
+    yield TestClient(app)
+    import_catalog.shutdown_parse_executor()
+
+@pytest.fixture
+def buffer(monkeypatch, supabase):
+    buffer = WriteBehindBuffer(supabase, max_rows=2, max_delay=60)
+    monkeypatch.setattr(import_catalog, 'write_buffer', buffer)
+    return buffer
+
+def test_failed_inline_flush_still_accepts_records(client, supabase, buffer):
+    supabase.fail = True
+
+    response = client.post('/api/import', files={'file': ('units.csv', catalog_csv((ID_A, 100), (ID_B, 200)))})
+
+    assert response.status_code == 200
+    assert response.json()["buffered"] is True
+    # The rows stay buffered for the background flusher
+    assert len(buffer) == 2
+
+def test_batch_import_goes_through_buffer(client, supabase, buffer):
+    buffer.max_rows = 10
+    client.post('/api/import', files={'file': ('old.csv', catalog_csv((ID_A, 100)))})
+
+    response = client.post('/api/import/batch', files=[
+        ('files', ('first.csv', catalog_csv((ID_A, 150)))),
+        ('files', ('second.csv', catalog_csv((ID_A, 175), (ID_B, 200)))),
+    ])
+
+    body = response.json()
+    assert body["buffered"] is True
+    assert [result["inserted"] for result in body["files"]] == [1, 2]
+    assert supabase.upserts == []
+
+    # The buffered single import must not overwrite the newer batch rows
+    buffer.flush()
+    prices = {record['id']: record['price_baht'] for batch in supabase.upserts for record in batch}
+    assert prices == {ID_A: 175, ID_B: 200}
+
+def test_blank_required_value_is_rejected_at_validation(client, supabase):
+    contents = catalog_csv((ID_A, 100)) + b'\n' + f'{ID_B},Dev,Project,Studio,102,A,30,,1'.encode()
+
+    response = client.post('/api/import', files={'file': ('units.csv', contents)})
+
+    assert response.status_code == 400
+    assert 'price_baht' in response.json()['detail']
+    assert supabase.upserts == []
+
+def test_flush_reports_rejected_rows(client, supabase, buffer):
+    buffer.add([{'id': ID_A, 'price_baht': 100}, {'id': ID_B, 'price_baht': float('nan')}])
+
+    body = client.post('/api/import/flush').json()
+
+    assert body["success"] is False
+    assert body["flushed"] == 1
+    assert [item["record"]["id"] for item in body["rejected"]] == [ID_B]
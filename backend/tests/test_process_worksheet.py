@@ -0,0 +1,110 @@
+import re
+import pytest
+import import_all_and_delete as importer
+from import_all_and_delete import REQUIRED_COLUMNS, ImportJournal, process_worksheet
+
+FILE_ID = 'file'
+MODIFIED_TIME = '2024-03-01T00:00:00Z'
+
+class FakeWorksheet:
+    """Worksheet serving A1-style row ranges from an in-memory table"""
+
+    def __init__(self, rows, title='Units'):
+        self.title = title
+        self.header = list(REQUIRED_COLUMNS)
+        self.rows = rows
+        self.row_count = len(rows) + 1
+        self.ranges = []
+
+    def row_values(self, row):
+        return self.header
+
+    def get(self, cell_range, value_render_option=None):
+        start, end = map(int, re.match(r'A(\d+):[A-Z]+(\d+)$', cell_range).groups())
+        self.ranges.append((start, end))
+        return [list(row) for row in self.rows[start - 2:end - 1]]
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, records):
+        self.records = records
+        return self
+
+    def execute(self):
+        if self.client.fail_on == len(self.client.upserts):
+            self.client.fail_on = None
+            raise ConnectionError('upsert failed')
+        self.client.upserts.append(self.records)
+
+class FakeSupabase:
+    def __init__(self, fail_on=None):
+        self.upserts = []
+        self.fail_on = fail_on
+
+    def table(self, name):
+        return FakeTable(self)
+
+def unit(number):
+    return ['Dev', 'Project', 'Studio', str(number), 'A', '30', 1000000 + number, 1]
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = ImportJournal(str(tmp_path / 'journal.sqlite3'))
+    yield journal
+    journal.close()
+
+def test_resumes_after_last_committed_range(journal):
+    worksheet = FakeWorksheet([unit(n) for n in range(5)])
+    supabase = FakeSupabase(fail_on=1)
+
+    # The second range fails, so only rows 2-3 are committed
+    assert process_worksheet(worksheet, supabase, journal, FILE_ID, MODIFIED_TIME, chunk_size=2) is None
+    assert journal.committed_chunks(FILE_ID, worksheet.title, MODIFIED_TIME) == (4, 2)
+
+    worksheet.ranges = []
+    assert process_worksheet(worksheet, supabase, journal, FILE_ID, MODIFIED_TIME, chunk_size=2) == 5
+    assert worksheet.ranges == [(4, 5), (6, 6)]
+    assert [[record['room_nymber'] for record in batch] for batch in supabase.upserts] == [
+        ['0', '1'], ['2', '3'], ['4']
+    ]
+
+def test_new_file_version_starts_from_the_top(journal):
+    worksheet = FakeWorksheet([unit(n) for n in range(3)])
+    journal.record_chunk(FILE_ID, worksheet.title, MODIFIED_TIME, 2, 3, 2)
+
+    assert process_worksheet(worksheet, FakeSupabase(), journal, FILE_ID, '2024-03-02T00:00:00Z', chunk_size=2) == 3
+    assert worksheet.ranges == [(2, 3), (4, 4)]
+
+def test_validation_error_after_upsert_is_retried(monkeypatch, journal):
+    worksheet = FakeWorksheet([unit(n) for n in range(4)])
+    validate_chunk = importer.validate_chunk
+    calls = []
+
+    def failing_second_chunk(df):
+        calls.append(len(df))
+        if len(calls) == 2:
+            raise ValueError('bad chunk')
+        return validate_chunk(df)
+
+    monkeypatch.setattr(importer, 'validate_chunk', failing_second_chunk)
+
+    assert process_worksheet(worksheet, FakeSupabase(), journal, FILE_ID, MODIFIED_TIME, chunk_size=2) is None
+    assert journal.committed_chunks(FILE_ID, worksheet.title, MODIFIED_TIME) == (4, 2)
+
+def test_validation_error_before_any_upsert_skips_worksheet(monkeypatch, journal):
+    worksheet = FakeWorksheet([unit(n) for n in range(4)])
+
+    def failing(df):
+        raise ValueError('bad chunk')
+
+    monkeypatch.setattr(importer, 'validate_chunk', failing)
+
+    assert process_worksheet(worksheet, FakeSupabase(), journal, FILE_ID, MODIFIED_TIME, chunk_size=2) == 0
+
+def test_finished_worksheet_clears_range_progress(journal):
+    journal.record_chunk(FILE_ID, 'Units', MODIFIED_TIME, 2, 3, 2)
+    journal.record_worksheet(FILE_ID, 'Units', MODIFIED_TIME, 4)
+
+    assert journal.committed_chunks(FILE_ID, 'Units', MODIFIED_TIME) == (2, 0)
@@ -0,0 +1,38 @@
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from api.responses import json_response, make_etag
+
+ETAG = make_etag('catalog', 1)
+
+app = FastAPI()
+
+@app.get("/rows")
+async def rows(request: Request):
+    return json_response(request, {"rows": ["x" * 40] * 100}, ETAG)
+
+client = TestClient(app)
+
+def test_compressed_representation_gets_its_own_tag():
+    response = client.get("/rows", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"] == f'{ETAG[:-1]}-gzip"'
+
+def test_not_modified_repeats_the_tag_the_client_holds():
+    gzip_tag = f'{ETAG[:-1]}-gzip"'
+
+    response = client.get("/rows", headers={"Accept-Encoding": "gzip", "If-None-Match": gzip_tag})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == gzip_tag
+
+def test_not_modified_for_identity_representation():
+    response = client.get("/rows", headers={"Accept-Encoding": "identity", "If-None-Match": f'"other", {ETAG}'})
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == ETAG
+
+def test_stale_tag_gets_full_response():
+    response = client.get("/rows", headers={"If-None-Match": '"stale-gzip"'})
+
+    assert response.status_code == 200
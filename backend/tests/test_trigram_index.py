@@ -0,0 +1,33 @@
+from api.trigram_index import TrigramIndex
+
+def index_of(*terms):
+    index = TrigramIndex()
+    for term_id, term in enumerate(terms):
+        index.add(term_id, term)
+    return index
+
+def test_partial_name_matches_long_term():
+    index = index_of('Sansiri Public Company Limited', 'Supalai')
+
+    matches = index.search('sansiri')
+
+    assert [term_id for term_id, _ in matches] == [0]
+    assert matches[0][1] == 1.0
+
+def test_misspelled_partial_name_matches():
+    index = index_of('Sansiri Public Company Limited')
+
+    assert [term_id for term_id, _ in index.search('sansri public')] == [0]
+
+def test_closer_word_window_ranks_first():
+    index = index_of('Seaside Grand Residence', 'Seasons Grand')
+
+    matches = index.search('seaside grand')
+
+    assert [term_id for term_id, _ in matches] == [0, 1]
+    assert matches[0][1] == 1.0 > matches[1][1]
+
+def test_unrelated_query_does_not_match():
+    index = index_of('Sansiri Public Company Limited')
+
+    assert index.search('lumpini') == []
@@ -0,0 +1,248 @@
+import json
+import pytest
+import import_all_and_delete as importer
+from import_all_and_delete import (
+    PAGE_TOKEN_KEY, RETRY_FILES_KEY, SPREADSHEET_MIME_TYPE, ImportJournal,
+    changed_folder_sheets, fetch_changes, watch_folder
+)
+
+FOLDER_ID = 'folder'
+
+class Request:
+    def __init__(self, execute):
+        self._execute = execute
+
+    def execute(self):
+        return self._execute()
+
+class FakeChanges:
+    """changes() resource serving pre-built pages of the change feed by page token"""
+
+    def __init__(self, pages, start_token):
+        self.pages = pages
+        self.start_token = start_token
+        self.requested = []
+        self.failures = 0
+
+    def getStartPageToken(self):
+        return Request(lambda: {'startPageToken': self.start_token})
+
+    def list(self, pageToken, **kwargs):
+        def execute():
+            self.requested.append(pageToken)
+            if self.failures:
+                self.failures -= 1
+                raise ConnectionError('Drive unavailable')
+            # An unknown token is the end of the feed with nothing new
+            return self.pages.get(pageToken, {'changes': [], 'newStartPageToken': pageToken})
+        return Request(execute)
+
+class FakeFiles:
+    def __init__(self, files):
+        self.files = files
+
+    def list(self, **kwargs):
+        return Request(lambda: {'files': list(self.files)})
+
+class FakeDrive:
+    def __init__(self, pages=None, start_token='start', folder_files=()):
+        self._changes = FakeChanges(pages or {}, start_token)
+        self._files = FakeFiles(folder_files)
+
+    def changes(self):
+        return self._changes
+
+    def files(self):
+        return self._files
+
+def sheet(file_id, parents=(FOLDER_ID,), **extra):
+    return {
+        'id': file_id, 'name': f'{file_id}.xlsx', 'mimeType': SPREADSHEET_MIME_TYPE,
+        'modifiedTime': '2024-03-01T00:00:00Z', 'parents': list(parents), **extra
+    }
+
+def change(file):
+    return {'fileId': file['id'], 'file': file}
+
+class StopWatching(Exception):
+    pass
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = ImportJournal(str(tmp_path / 'journal.sqlite3'))
+    yield journal
+    journal.close()
+
+@pytest.fixture
+def imports(monkeypatch):
+    """Record import_files calls; files whose id starts with "bad" fail"""
+    calls = []
+
+    def import_files(files, sheets_client, drive_service, supabase, journal):
+        calls.append([file['id'] for file in files])
+        failed = [file for file in files if file['id'].startswith('bad')]
+        return len(files) - len(failed), failed
+
+    monkeypatch.setattr(importer, 'import_files', import_files)
+    return calls
+
+def stop_after(monkeypatch, polls):
+    """Make time.sleep end the watch loop after the given number of polls"""
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) >= polls:
+            raise StopWatching()
+
+    monkeypatch.setattr(importer.time, 'sleep', sleep)
+    return sleeps
+
+def test_fetch_changes_follows_pages_to_new_start_token():
+    drive = FakeDrive({
+        't1': {'changes': [change(sheet('a'))], 'nextPageToken': 't2'},
+        't2': {'changes': [change(sheet('b'))], 'nextPageToken': 't3'},
+        't3': {'changes': [change(sheet('c'))], 'newStartPageToken': 't4'},
+    })
+
+    changes, token = fetch_changes(drive, 't1')
+
+    assert [entry['fileId'] for entry in changes] == ['a', 'b', 'c']
+    assert token == 't4'
+    assert drive.changes().requested == ['t1', 't2', 't3']
+
+def test_changed_folder_sheets_keeps_live_sheets_in_folder():
+    changes = [
+        change(sheet('kept')),
+        {'fileId': 'removed', 'removed': True},
+        change(sheet('trashed', trashed=True)),
+        change(sheet('foreign', parents=('other',))),
+        change(dict(sheet('doc'), mimeType='application/vnd.google-apps.document')),
+        {'fileId': 'no-file'},
+    ]
+
+    assert [file['id'] for file in changed_folder_sheets(changes, FOLDER_ID)] == ['kept']
+
+def test_changed_folder_sheets_latest_change_wins():
+    edited = sheet('edited', modifiedTime='2024-03-02T00:00:00Z')
+    changes = [
+        change(sheet('edited')),
+        change(edited),
+        change(sheet('deleted')),
+        {'fileId': 'deleted', 'removed': True},
+        change(sheet('moved')),
+        change(sheet('moved', parents=('other',))),
+        change(sheet('binned')),
+        change(sheet('binned', trashed=True)),
+    ]
+
+    assert changed_folder_sheets(changes, FOLDER_ID) == [edited]
+
+def test_watch_folder_scans_once_and_persists_token(monkeypatch, journal, imports):
+    drive = FakeDrive(
+        {'start': {'changes': [change(sheet('new'))], 'newStartPageToken': 'next'}},
+        start_token='start',
+        folder_files=[sheet('existing')]
+    )
+    stop_after(monkeypatch, 1)
+
+    with pytest.raises(StopWatching):
+        watch_folder(FOLDER_ID, None, drive, None, journal)
+
+    assert imports == [['existing'], ['new']]
+    assert journal.get_state(PAGE_TOKEN_KEY) == 'next'
+
+def test_watch_folder_resumes_from_stored_token(monkeypatch, journal, imports):
+    journal.set_state(PAGE_TOKEN_KEY, 'saved')
+    drive = FakeDrive(
+        {'saved': {'changes': [change(sheet('a'))], 'newStartPageToken': 'after'}},
+        folder_files=[sheet('existing')]
+    )
+    stop_after(monkeypatch, 2)
+
+    with pytest.raises(StopWatching):
+        watch_folder(FOLDER_ID, None, drive, None, journal)
+
+    # No full scan, and the second poll starts from the token saved by the first
+    assert imports == [['a']]
+    assert drive.changes().requested == ['saved', 'after']
+    assert journal.get_state(PAGE_TOKEN_KEY) == 'after'
+
+def test_watch_folder_ignores_irrelevant_changes(monkeypatch, journal, imports):
+    journal.set_state(PAGE_TOKEN_KEY, 'saved')
+    drive = FakeDrive({'saved': {
+        'changes': [
+            {'fileId': 'gone', 'removed': True},
+            change(sheet('trashed', trashed=True)),
+            change(sheet('foreign', parents=('other',))),
+        ],
+        'newStartPageToken': 'after'
+    }})
+    stop_after(monkeypatch, 1)
+
+    with pytest.raises(StopWatching):
+        watch_folder(FOLDER_ID, None, drive, None, journal)
+
+    assert imports == []
+    assert journal.get_state(PAGE_TOKEN_KEY) == 'after'
+
+def test_watch_folder_caps_idle_interval(monkeypatch, journal, imports):
+    journal.set_state(PAGE_TOKEN_KEY, 'saved')
+    sleeps = stop_after(monkeypatch, 6)
+
+    with pytest.raises(StopWatching):
+        watch_folder(FOLDER_ID, None, FakeDrive(), None, journal,
+                     poll_interval=1.0, max_idle_interval=5.0, max_poll_interval=300.0)
+
+    assert sleeps == [2.0, 4.0, 5.0, 5.0, 5.0, 5.0]
+
+def test_watch_folder_backs_off_exponentially_on_errors(monkeypatch, journal, imports):
+    journal.set_state(PAGE_TOKEN_KEY, 'saved')
+    drive = FakeDrive()
+    drive.changes().failures = 4
+    sleeps = stop_after(monkeypatch, 5)
+
+    with pytest.raises(StopWatching):
+        watch_folder(FOLDER_ID, None, drive, None, journal,
+                     poll_interval=1.0, max_idle_interval=5.0, max_poll_interval=10.0)
+
+    # Errors double up to max_poll_interval; the first good poll drops back to idle pacing
+    assert sleeps == [2.0, 4.0, 8.0, 10.0, 2.0]
+    assert journal.get_state(PAGE_TOKEN_KEY) == 'saved'
+
+def test_watch_folder_retries_failed_files(monkeypatch, journal, imports):
+    journal.set_state(PAGE_TOKEN_KEY, 'saved')
+    drive = FakeDrive({
+        'saved': {'changes': [change(sheet('good')), change(sheet('bad'))], 'newStartPageToken': 'after'}
+    })
+    stop_after(monkeypatch, 2)
+
+    with pytest.raises(StopWatching):
+        watch_folder(FOLDER_ID, None, drive, None, journal, retry_interval=0)
+
+    # The failed file is retried on the next poll although the feed has no new change for it
+    assert imports == [['good', 'bad'], ['bad']]
+    assert [file['id'] for file in json.loads(journal.get_state(RETRY_FILES_KEY))] == ['bad']
+
+def test_watch_folder_loads_retry_set_from_journal(monkeypatch, journal, imports):
+    journal.set_state(PAGE_TOKEN_KEY, 'saved')
+    journal.set_state(RETRY_FILES_KEY, json.dumps([sheet('flaky')]))
+    stop_after(monkeypatch, 1)
+
+    with pytest.raises(StopWatching):
+        watch_folder(FOLDER_ID, None, FakeDrive(), None, journal, retry_interval=0)
+
+    assert imports == [['flaky']]
+    assert json.loads(journal.get_state(RETRY_FILES_KEY)) == []
+
+def test_watch_folder_drops_retry_of_removed_file(monkeypatch, journal, imports):
+    journal.set_state(PAGE_TOKEN_KEY, 'saved')
+    journal.set_state(RETRY_FILES_KEY, json.dumps([sheet('bad')]))
+    drive = FakeDrive({'saved': {'changes': [{'fileId': 'bad', 'removed': True}], 'newStartPageToken': 'after'}})
+    stop_after(monkeypatch, 1)
+
+    with pytest.raises(StopWatching):
+        watch_folder(FOLDER_ID, None, drive, None, journal, retry_interval=0)
+
+    assert imports == []
+    assert json.loads(journal.get_state(RETRY_FILES_KEY)) == []
@@ -0,0 +1,91 @@
+import asyncio
+import math
+import pytest
+from postgrest.exceptions import APIError
+import main
+from api.write_buffer import WriteBehindBuffer
+
+class FakeTable:
+    def __init__(self, client):
+        self.client = client
+
+    def upsert(self, records):
+        self.records = records
+        return self
+
+    def execute(self):
+        self.client.requests.append(len(self.records))
+        if self.client.down:
+            raise ConnectionError('connection refused')
+        if any(isinstance(record['price_baht'], float) and math.isnan(record['price_baht']) for record in self.records):
+            # PostgREST answers 400 to the NaN literal in the JSON body
+            raise APIError({'code': 'PGRST102', 'message': 'Empty or invalid json'})
+        self.client.written.extend(self.records)
+
+class FakeSupabase:
+    def __init__(self):
+        self.requests = []
+        self.written = []
+        self.down = False
+
+    def table(self, name):
+        return FakeTable(self)
+
+def unit(room, price):
+    return {'developer': 'Dev', 'project_name': 'Project', 'block': 'A', 'room_nymber': room, 'price_baht': price}
+
+def test_bad_row_is_isolated_and_rejected():
+    supabase = FakeSupabase()
+    buffer = WriteBehindBuffer(supabase)
+    buffer.add([unit(str(room), 100.0) for room in range(7)] + [unit('bad', float('nan'))])
+
+    assert buffer.flush() == 7
+
+    assert sorted(record['room_nymber'] for record in supabase.written) == [str(room) for room in range(7)]
+    assert len(buffer) == 0
+    rejected = buffer.take_rejected()
+    assert [item['record']['room_nymber'] for item in rejected] == ['bad']
+    assert 'invalid json' in rejected[0]['error']
+    assert buffer.take_rejected() == []
+
+    # Nothing left to retry
+    assert buffer.flush() == 0
+
+def test_transient_failure_keeps_rows_buffered():
+    supabase = FakeSupabase()
+    supabase.down = True
+    buffer = WriteBehindBuffer(supabase)
+    buffer.add([unit('1', 100.0), unit('2', 200.0)])
+
+    with pytest.raises(ConnectionError):
+        buffer.flush()
+
+    # Not bisected: one request, both rows kept, nothing rejected
+    assert supabase.requests == [2]
+    assert len(buffer) == 2
+    assert buffer.take_rejected() == []
+
+    supabase.down = False
+    assert buffer.flush() == 2
+
+def test_shutdown_stops_parse_workers_when_final_flush_fails(monkeypatch):
+    supabase = FakeSupabase()
+    supabase.down = True
+    buffer = WriteBehindBuffer(supabase)
+    buffer.add([unit('1', 100.0)])
+    stopped = []
+
+    async def poll_catalog():
+        await asyncio.Event().wait()
+
+    monkeypatch.setattr(main, 'poll_catalog', poll_catalog)
+    monkeypatch.setattr(main, 'write_buffer', buffer)
+    monkeypatch.setattr(main, 'shutdown_parse_executor', lambda: stopped.append(True))
+
+    async def serve():
+        async with main.lifespan(main.app):
+            pass
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(serve())
+    assert stopped == [True]
@@ -0,0 +1,18 @@
+-- Keep catalog.updated_at current on every update, so readers can poll for changed rows
+create or replace function public.set_catalog_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+DROP TRIGGER IF EXISTS trg_catalog_updated_at ON public.catalog;
+CREATE TRIGGER trg_catalog_updated_at
+    BEFORE UPDATE ON public.catalog
+    FOR EACH ROW
+    EXECUTE FUNCTION public.set_catalog_updated_at();
+
+COMMENT ON FUNCTION public.set_catalog_updated_at() IS 'Sets catalog.updated_at to now() on update';
@@ -0,0 +1,47 @@
+-- Atomically reserve stock for many catalog units in one call
+create or replace function public.reserve_stock(items jsonb)
+returns table (
+    unit_id       uuid,
+    requested_qty int,
+    reserved      boolean,
+    remaining_qty int
+)
+language plpgsql
+as $$
+begin
+    -- Lock the requested rows in id order, so concurrent multi-unit
+    -- reservations queue behind each other instead of deadlocking
+    PERFORM 1
+    FROM public.catalog c
+    WHERE c.id IN (SELECT (item ->> 'id')::uuid FROM jsonb_array_elements(items) AS item)
+    ORDER BY c.id
+    FOR UPDATE;
+
+    -- Conditional decrement: a unit is reserved only if enough stock is left
+    RETURN QUERY
+    WITH requested AS (
+        SELECT (item ->> 'id')::uuid AS id, sum((item ->> 'qty')::int)::int AS qty
+        FROM jsonb_array_elements(items) AS item
+        GROUP BY 1
+    ),
+    updated AS (
+        UPDATE public.catalog c
+        SET stock_qty = c.stock_qty - r.qty
+        FROM requested r
+        WHERE c.id = r.id
+          AND r.qty > 0
+          AND c.stock_qty >= r.qty
+        RETURNING c.id, c.stock_qty
+    )
+    SELECT r.id, r.qty, u.id IS NOT NULL, coalesce(u.stock_qty, c.stock_qty)
+    FROM requested r
+    LEFT JOIN updated u ON u.id = r.id
+    LEFT JOIN public.catalog c ON c.id = r.id;
+end;
+$$;
+
+-- Only the backend (service role) may reserve stock
+REVOKE EXECUTE ON FUNCTION public.reserve_stock(jsonb) FROM public, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.reserve_stock(jsonb) TO service_role;
+
+COMMENT ON FUNCTION public.reserve_stock(jsonb) IS 'Decrements stock_qty for [{"id", "qty"}] items where enough stock is left; returns per-unit results';
@@ -0,0 +1,257 @@
+-- Price and stock history of catalog units, stored as deltas:
+-- each row holds only the fields that changed, the other one is null
+create table if not exists public.catalog_price_history (
+  catalog_id   uuid        not null,
+  changed_at   timestamptz not null default clock_timestamp(),
+  price_baht   numeric,
+  stock_qty    int
+) partition by range (changed_at);
+
+CREATE INDEX if not exists idx_catalog_price_history_unit
+    ON public.catalog_price_history (catalog_id, changed_at);
+
+-- Partitions live in a schema PostgREST does not expose: RLS on the parent is
+-- not inherited by its partitions, so only the parent may be reachable
+create schema if not exists private;
+revoke all on schema private from public, anon, authenticated;
+
+-- Catch-all for rows outside the monthly partitions, e.g. a month whose
+-- partition was not created in time
+create table if not exists private.catalog_price_history_default
+    partition of public.catalog_price_history default;
+
+-- Create monthly partitions from a given month up to months_ahead months from now.
+-- Postgres refuses to create a partition while the default partition holds rows
+-- in its range, so for such a month the default is detached, the partition
+-- created, the rows moved over, and the default attached again. This all runs
+-- in one transaction; concurrent inserts wait on the table lock meanwhile.
+create or replace function public.create_catalog_price_history_partitions(
+    from_month date default date_trunc('month', now())::date,
+    months_ahead int default 3
+)
+returns void
+language plpgsql
+as $$
+declare
+    month_start    date := date_trunc('month', from_month)::date;
+    month_end      date;
+    last_month     date := (date_trunc('month', now()) + make_interval(months => months_ahead))::date;
+    partition_name text;
+begin
+    while month_start <= last_month loop
+        month_end := (month_start + interval '1 month')::date;
+        partition_name := 'catalog_price_history_' || to_char(month_start, 'YYYY_MM');
+
+        if to_regclass('private.' || partition_name) is null then
+            if exists (
+                SELECT 1 FROM private.catalog_price_history_default
+                WHERE changed_at >= month_start AND changed_at < month_end
+            ) then
+                ALTER TABLE public.catalog_price_history
+                    DETACH PARTITION private.catalog_price_history_default;
+                execute format(
+                    'create table private.%I partition of public.catalog_price_history '
+                    'for values from (%L) to (%L)',
+                    partition_name, month_start, month_end
+                );
+                WITH moved AS (
+                    DELETE FROM private.catalog_price_history_default
+                    WHERE changed_at >= month_start AND changed_at < month_end
+                    RETURNING catalog_id, changed_at, price_baht, stock_qty
+                )
+                INSERT INTO public.catalog_price_history (catalog_id, changed_at, price_baht, stock_qty)
+                SELECT catalog_id, changed_at, price_baht, stock_qty FROM moved;
+                ALTER TABLE public.catalog_price_history
+                    ATTACH PARTITION private.catalog_price_history_default DEFAULT;
+            else
+                execute format(
+                    'create table private.%I partition of public.catalog_price_history '
+                    'for values from (%L) to (%L)',
+                    partition_name, month_start, month_end
+                );
+            end if;
+        end if;
+
+        month_start := month_end;
+    end loop;
+end;
+$$;
+
+-- Partition maintenance is for the migration and pg_cron only, not for API callers
+revoke execute on function public.create_catalog_price_history_partitions(date, int)
+    from public, anon, authenticated;
+
+-- Partitions for existing rows and the coming year
+SELECT public.create_catalog_price_history_partitions(
+    coalesce((SELECT min(updated_at) FROM public.catalog), now())::date,
+    12
+);
+
+-- Keep three months of partitions ahead: pg_cron runs the function at 00:00
+-- UTC on the 25th of every month, so next month's partition always exists
+-- before its first row arrives. Scheduling by name replaces an existing job.
+create extension if not exists pg_cron;
+
+SELECT cron.schedule(
+    'catalog-price-history-partitions',
+    '0 0 25 * *',
+    $$SELECT public.create_catalog_price_history_partitions()$$
+);
+
+-- Append the changed fields on every insert or price/stock update
+create or replace function public.log_catalog_price_change()
+returns trigger
+language plpgsql
+as $$
+begin
+    if tg_op = 'INSERT' then
+        INSERT INTO public.catalog_price_history (catalog_id, price_baht, stock_qty)
+        VALUES (new.id, new.price_baht, new.stock_qty);
+    elsif new.price_baht is distinct from old.price_baht
+       or new.stock_qty is distinct from old.stock_qty then
+        INSERT INTO public.catalog_price_history (catalog_id, price_baht, stock_qty)
+        VALUES (
+            new.id,
+            case when new.price_baht is distinct from old.price_baht then new.price_baht end,
+            case when new.stock_qty is distinct from old.stock_qty then new.stock_qty end
+        );
+    end if;
+    return null;
+end;
+$$;
+
+DROP TRIGGER IF EXISTS trg_catalog_price_history ON public.catalog;
+CREATE TRIGGER trg_catalog_price_history
+    AFTER INSERT OR UPDATE OF price_baht, stock_qty ON public.catalog
+    FOR EACH ROW
+    EXECUTE FUNCTION public.log_catalog_price_change();
+
+-- Seed the history with the current state of existing units
+INSERT INTO public.catalog_price_history (catalog_id, changed_at, price_baht, stock_qty)
+SELECT id, updated_at, price_baht, stock_qty
+FROM public.catalog;
+
+-- State of units as of a point in time: latest non-null price and stock per
+-- unit, each found by one backward scan of idx_catalog_price_history_unit.
+-- Rows come in catalog_id order; pass the last catalog_id of a page as
+-- p_after_id to read the next one, p_limit rows at a time.
+create or replace function public.catalog_state_as_of(
+    p_as_of        timestamptz,
+    p_unit_id      uuid default null,
+    p_developer    text default null,
+    p_project_name text default null,
+    p_after_id     uuid default null,
+    p_limit        int default null
+)
+returns table (
+    catalog_id   uuid,
+    developer    text,
+    project_name text,
+    room_nymber  text,
+    block        text,
+    price_baht   numeric,
+    stock_qty    int
+)
+language sql
+stable
+as $$
+    SELECT c.id, c.developer, c.project_name, c.room_nymber, c.block, p.price_baht, s.stock_qty
+    FROM public.catalog c
+    LEFT JOIN LATERAL (
+        SELECT h.price_baht
+        FROM public.catalog_price_history h
+        WHERE h.catalog_id = c.id AND h.changed_at <= p_as_of AND h.price_baht IS NOT NULL
+        ORDER BY h.changed_at DESC
+        LIMIT 1
+    ) p ON true
+    LEFT JOIN LATERAL (
+        SELECT h.stock_qty
+        FROM public.catalog_price_history h
+        WHERE h.catalog_id = c.id AND h.changed_at <= p_as_of AND h.stock_qty IS NOT NULL
+        ORDER BY h.changed_at DESC
+        LIMIT 1
+    ) s ON true
+    WHERE (p_unit_id IS NULL OR c.id = p_unit_id)
+      AND (p_developer IS NULL OR c.developer = p_developer)
+      AND (p_project_name IS NULL OR c.project_name = p_project_name)
+      AND (p_after_id IS NULL OR c.id > p_after_id)
+      AND (p.price_baht IS NOT NULL OR s.stock_qty IS NOT NULL)
+    ORDER BY c.id
+    LIMIT p_limit
+$$;
+
+-- Full price/stock time series of units between two points in time: the state
+-- at p_from followed by every change up to p_to, with unchanged fields filled forward.
+-- Points come in (catalog_id, changed_at) order; pass those of the last point
+-- of a page as p_after_id and p_after_time to read the next one, p_limit points
+-- at a time. Units before p_after_id are skipped, not computed and discarded.
+create or replace function public.catalog_price_series(
+    p_from         timestamptz,
+    p_to           timestamptz default now(),
+    p_unit_id      uuid default null,
+    p_developer    text default null,
+    p_project_name text default null,
+    p_after_id     uuid default null,
+    p_after_time   timestamptz default null,
+    p_limit        int default null
+)
+returns table (
+    catalog_id uuid,
+    changed_at timestamptz,
+    price_baht numeric,
+    stock_qty  int
+)
+language sql
+stable
+as $$
+    WITH units AS (
+        SELECT c.id
+        FROM public.catalog c
+        WHERE (p_unit_id IS NULL OR c.id = p_unit_id)
+          AND (p_developer IS NULL OR c.developer = p_developer)
+          AND (p_project_name IS NULL OR c.project_name = p_project_name)
+          AND (p_after_id IS NULL OR c.id >= p_after_id)
+    ),
+    events AS (
+        SELECT s.catalog_id, p_from AS changed_at, s.price_baht, s.stock_qty
+        FROM public.catalog_state_as_of(p_from, p_unit_id, p_developer, p_project_name) s
+        WHERE p_after_id IS NULL OR s.catalog_id >= p_after_id
+        UNION ALL
+        SELECT h.catalog_id, h.changed_at, h.price_baht, h.stock_qty
+        FROM units u
+        JOIN public.catalog_price_history h ON h.catalog_id = u.id
+        WHERE h.changed_at > p_from AND h.changed_at <= p_to
+    ),
+    grouped AS (
+        SELECT e.*,
+               count(e.price_baht) OVER w AS price_group,
+               count(e.stock_qty) OVER w AS stock_group
+        FROM events e
+        WINDOW w AS (PARTITION BY e.catalog_id ORDER BY e.changed_at)
+    ),
+    filled AS (
+        SELECT g.catalog_id,
+               g.changed_at,
+               first_value(g.price_baht) OVER (PARTITION BY g.catalog_id, g.price_group ORDER BY g.changed_at) AS price_baht,
+               first_value(g.stock_qty) OVER (PARTITION BY g.catalog_id, g.stock_group ORDER BY g.changed_at) AS stock_qty
+        FROM grouped g
+    )
+    SELECT f.catalog_id, f.changed_at, f.price_baht, f.stock_qty
+    FROM filled f
+    WHERE p_after_id IS NULL OR (f.catalog_id, f.changed_at) > (p_after_id, p_after_time)
+    ORDER BY f.catalog_id, f.changed_at
+    LIMIT p_limit
+$$;
+
+-- Add row level security (RLS)
+ALTER TABLE public.catalog_price_history ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Enable read access for all users" ON public.catalog_price_history
+    FOR SELECT USING (true);
+
+-- Add helpful comments
+COMMENT ON TABLE public.catalog_price_history IS 'Changed price/stock fields of catalog units, partitioned by month';
+COMMENT ON COLUMN public.catalog_price_history.catalog_id IS 'Catalog unit the change belongs to';
+COMMENT ON COLUMN public.catalog_price_history.changed_at IS 'When the change was written';
+COMMENT ON COLUMN public.catalog_price_history.price_baht IS 'New price in Thai Baht, null if unchanged';
+COMMENT ON COLUMN public.catalog_price_history.stock_qty IS 'New number of units available, null if unchanged';